@@ -8,3 +8,6 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 Datasets_path = os.path.join(current_dir, '../../Datasets/src')
 TrOcr_path = os.path.join(current_dir, '../../TrOCR_model/src')
 LLMs_path = os.path.join(current_dir, '../../LLMs/src')
+
+# Datasets built by the Datasets project, each announced on the channel with "{name}_done"
+DATASET_NAMES = ('bentham', 'washington', 'iam')
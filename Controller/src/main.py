@@ -1,16 +1,18 @@
 import redis
 import subprocess
 
-from constants import Datasets_path, LLMs_path
+from constants import Datasets_path, LLMs_path, DATASET_NAMES
 
 
-def run_project_in_conda(project_dir, env_name, script_name):
+def run_project_in_conda(project_dir, env_name, script_name, args='', wait=True):
     # Command to activate the specific conda environment and run the project script
-    command = f'conda run --name {env_name} python {project_dir}/{script_name}'
+    command = f'conda run --name {env_name} python {project_dir}/{script_name} {args}'.strip()
 
     # Run the command in a new subprocess
     process = subprocess.Popen(command, shell=True)
-    process.wait()  # Wait for the subprocess to finish before continuing
+    if wait:
+        process.wait()  # Wait for the subprocess to finish before continuing
+    return process
 
 
 def main():
@@ -20,16 +22,24 @@ def main():
     pubsub.subscribe("project_channel")
 
     print("Controller is listening for project completion events...")
-    # Start by launching the first project in its own conda environment
-    run_project_in_conda(Datasets_path, "Datasets_Conda", "main.py")
+    # Start by launching the first project in its own conda environment; it runs in the background so that
+    # each dataset's event is handled as soon as it is published
+    run_project_in_conda(Datasets_path, "Datasets_Conda", "main.py", wait=False)
+    dataset_events = {f"{name}_done": name for name in DATASET_NAMES}
+    llm_processes = dict()
+
     for message in pubsub.listen():
         print(f"Received message: {message}")
         if message['type'] == 'message':  # Check if it's a message
             data = message['data'].decode('utf-8')  # Decode the message from bytes to string
             print(f"Decoded message: {data}")
-            if data == 'datasets_done':
-                print("Project Dataset completed. Starting Project LLMs...")
-                run_project_in_conda(LLMs_path, "trocr_1", "main.py")
+            if data in dataset_events:
+                # Each dataset starts its own LLM run as soon as it is built, without waiting for the slowest one
+                name = dataset_events[data]
+                print(f"Dataset {name} completed. Starting Project LLMs for {name}...")
+                llm_processes[name] = run_project_in_conda(LLMs_path, "trocr_1", "main_gpt.py", args=name, wait=False)
+            elif data == 'datasets_done':
+                print(f"Project Dataset completed. LLM runs started for: {', '.join(llm_processes)}")
             # elif message['data'] == b'project2_done':
             #     print("Project 2 completed. Starting Project 3...")
             #     run_project_in_conda("/path/to/project3", "project3_env", "project3.py")
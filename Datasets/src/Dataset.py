@@ -1,170 +1,177 @@
 import os
-import html
+import json
+import time
 import multiprocessing
+from collections import deque
+from contextlib import contextmanager
 from functools import partial
+from itertools import islice
 import numpy as np
 import h5py
 from tqdm import tqdm
 from utils import preproc as pp
-from utils.text_processing import correct_punctuation_spacing
+from utils import manifest as mf
+from utils import hdf5_layout
+from utils import gt_index
+from utils import image_archive as ia
+from utils import outputs as out
 
 
 class Dataset:
     """Dataset class to read images and sentences from base (raw files)"""
 
-    def __init__(self, source, name, partition_name="cv1"):
+    def __init__(self, source, name, partition_name="cv1", cache_dir=None):
         """
         Initialize the Dataset object.
         :param source: Path to the dataset source.
         :param name: Name of the dataset.
         :param partition_name: Partition name (default is 'cv1').
+        :param cache_dir: Directory of the cached ground truth index (None parses the transcriptions every time).
         """
         self.source = source
         self.name = name
-        self.dataset = None
         self.partition_name = partition_name
+        self.cache_dir = cache_dir
+        self.gt_dict = None
+        self.warnings = set()
         self.partitions = ['train_100', 'train_75', 'train_50', 'train_25', 'valid', 'test']
+        # Only these partitions hold data in the HDF5 file; the smaller train subsets are views of 'train_100'
+        self.stored_partitions = ['train_100', 'valid', 'test']
+        self.line_counts = dict()
+        self.subset_sizes = dict()
+
+        # Readers are generators of (line_id, image_path, text) records for the 'train', 'valid' or 'test' split.
+        # A new corpus only needs its own reader method registered here.
+        self.readers = {
+            'bentham': self._bentham,
+            'washington': self._washington,
+            'iam': self._iam
+        }
 
     def read_partitions(self):
-        """Read images and sentences from dataset"""
-        if self.name == "bentham":
-            dataset = self._bentham(self.partition_name)  # Call Bentham processor
-        elif self.name == "washington":
-            dataset = self._washington(self.partition_name)  # Call Washington processor
-        elif self.name == "iam":
-            print("Loading IAM dataset...")  # Debug print for IAM loading
-            dataset = self._iam(self.partition_name)  # Call IAM processor
-            print(f"IAM dataset loaded with {len(dataset['train']['dt'])} training samples.")
-
-        if not self.dataset:
-            self.dataset = self._init_dataset()
-
-        total_train = len(dataset['train']['dt'])  # Get the total number of training examples
+        """Scan the dataset once to count the lines of every partition (records are read lazily by `lines`)"""
+        if self.name not in self.readers:
+            raise ValueError(f"No reader registered for dataset '{self.name}'.")
+
+        self.line_counts = {pt: sum(1 for _ in self.lines(pt)) for pt in self.stored_partitions}
+
+        total_train = self.line_counts['train_100']  # Get the total number of training examples
+        if total_train == 0:
+            raise ValueError(f"No training data found for {self.name} dataset. Please check your files.")
+
         print(f"total {self.name}: {total_train}")
-        # Split the training data into subsets of 100%, 75%, 50%, and 25%
-        split_indices = {
-            'train_100': total_train,
+        # The full training set is stored once; 75%, 50% and 25% are prefixes of it
+        self.subset_sizes = self._subset_sizes(total_train)
+
+    def lines(self, partition):
+        """
+        Lazily read the lines of a stored partition.
+
+        :param partition: 'train_100', 'valid' or 'test'.
+        :return: Generator of (line_id, image_path, text).
+        """
+        split = 'train' if partition == 'train_100' else partition
+        return self.readers[self.name](split)
+
+    @staticmethod
+    def _subset_sizes(total_train):
+        """Sizes of the train subsets, as prefixes of 'train_100'"""
+        return {
             'train_75': int(0.75 * total_train),
             'train_50': int(0.50 * total_train),
             'train_25': int(0.25 * total_train)
         }
 
-        # Assign data to each train subset
-        for subset in split_indices:
-            self.dataset[subset]['path'] += dataset['train']['path'][:split_indices[subset]]
-            self.dataset[subset]['dt'] += dataset['train']['dt'][:split_indices[subset]]
-            self.dataset[subset]['gt'] += dataset['train']['gt'][:split_indices[subset]]
-
-        # Add validation and test sets
-        for y in ['valid', 'test']:
-            self.dataset[y]['path'] += dataset[y]['path']
-            self.dataset[y]['dt'] += dataset[y]['dt']
-            self.dataset[y]['gt'] += dataset[y]['gt']
-
-    def _bentham(self, partition_name):
+    def _ground_truth(self, load_index):
+        """Ground truth index of the dataset, loaded once per Dataset object"""
+        if self.gt_dict is None:
+            self.gt_dict = load_index(self.source, cache_dir=self.cache_dir)
+        return self.gt_dict
+
+    def _warn(self, message):
+        """Print a reader warning once, even though the partitions are read several times"""
+        if message not in self.warnings:
+            self.warnings.add(message)
+            print(message)
+
+    @staticmethod
+    def _split_lines(*split_files):
+        """Yield the line ids listed in one or more split files"""
+        for split_file in split_files:
+            with open(split_file) as file:
+                for line in file:
+                    line = line.rstrip("\r\n")
+                    if line:
+                        yield line
+
+    def _bentham(self, split):
         """Bentham dataset reader and processor"""
-        source = os.path.join(self.source)
-        pt_path = os.path.join(source, "Partitions")
-
-        # Load paths for train, valid, and test splits
-        paths = {
-            "train": open(os.path.join(pt_path, "TrainLines.lst")).read().splitlines(),
-            "valid": open(os.path.join(pt_path, "ValidationLines.lst")).read().splitlines(),
-            "test": open(os.path.join(pt_path, "TestLines.lst")).read().splitlines()
-        }
+        pt_path = os.path.join(self.source, "Partitions")
+        split_files = {"train": "TrainLines.lst", "valid": "ValidationLines.lst", "test": "TestLines.lst"}
 
         # Load transcriptions (ground truth)
-        transcriptions = os.path.join(source, "Transcriptions")
-        gt_files = os.listdir(transcriptions)
-        gt_dict = {}
-
-        # Process the transcription files
-        for gt_file in gt_files:
-            text = " ".join(open(os.path.join(transcriptions, gt_file)).read().splitlines())
-            text = html.unescape(text).replace("<gap/>", "")
-            gt_dict[os.path.splitext(gt_file)[0]] = " ".join(text.split())
+        gt_dict = self._ground_truth(gt_index.bentham_index)
 
         # Path for the images (Lines)
-        img_path = os.path.join(source, "Images", "Lines")
-        dataset = {
-            "train": {"path": [], "dt": [], "gt": []},
-            "valid": {"path": [], "dt": [], "gt": []},
-            "test": {"path": [], "dt": [], "gt": []}
-        }
+        img_path = os.path.join(self.source, "Images", "Lines")
 
-        # Process the dataset for each partition (train, valid, test)
-        for partition in ["train", "valid", "test"]:
-            for line in paths[partition]:
-                if line not in gt_dict:
-                    print(f"Warning: Missing ground truth for {line}, skipping.")
-                    continue
-                    # Check if the label is empty
-                label = gt_dict[line].strip()
-                if len(label) == 0:
-                    print(f"Warning: Empty label for {line}, skipping.")
-                    continue
-                dataset[partition]['dt'].append(os.path.join(img_path, f"{line}.png"))
-                dataset[partition]['gt'].append(gt_dict[line])
-                dataset[partition]['path'].append(os.path.join(img_path, f"{line}.png"))
-
-        return dataset
-
-    def _washington(self, partition_name):
-        """Washington dataset reader"""
-        pt_path = os.path.join(self.source, "sets", partition_name)
+        for line in self._split_lines(os.path.join(pt_path, split_files[split])):
+            if line not in gt_dict:
+                self._warn(f"Warning: Missing ground truth for {line}, skipping.")
+                continue
+            # Check if the label is empty
+            if len(gt_dict[line].strip()) == 0:
+                self._warn(f"Warning: Empty label for {line}, skipping.")
+                continue
+            yield line, os.path.join(img_path, f"{line}.png"), gt_dict[line]
 
-        paths = {
-            "train": open(os.path.join(pt_path, "train.txt")).read().splitlines(),
-            "valid": open(os.path.join(pt_path, "valid.txt")).read().splitlines(),
-            "test": open(os.path.join(pt_path, "test.txt")).read().splitlines()
-        }
+    def _washington(self, split):
+        """Washington dataset reader"""
+        pt_path = os.path.join(self.source, "sets", self.partition_name)
 
         # Load transcriptions (ground truth)
-        lines = open(os.path.join(self.source, "ground_truth", "transcription.txt")).read().splitlines()
-        gt_dict = {}
-
-        for line in lines:
-            split = line.split()
-            split[1] = split[1].replace("-", "").replace("|", " ")
-            split[1] = split[1].replace("s_pt", ".").replace("s_cm", ",")
-            split[1] = split[1].replace("s_mi", "-").replace("s_qo", ":")
-            split[1] = split[1].replace("s_sq", ";").replace("s_et", "V")
-            split[1] = split[1].replace("s_bl", "(").replace("s_br", ")")
-            split[1] = split[1].replace("s_qt", "'").replace("s_GW", "G.W.")
-            split[1] = split[1].replace("s_", "")
-            gt_dict[split[0]] = split[1]
+        gt_dict = self._ground_truth(gt_index.washington_index)
 
         # Path for the images
         img_path = os.path.join(self.source, "data", "line_images_normalized")
-        dataset = {
-            "train": {"path": [], "dt": [], "gt": []},
-            "valid": {"path": [], "dt": [], "gt": []},
-            "test": {"path": [], "dt": [], "gt": []}
-        }
-
-        for i in ["train", "valid", "test"]:
-            for line in paths[i]:
-                dataset[i]['dt'].append(os.path.join(img_path, f"{line}.png"))
-                dataset[i]['gt'].append(gt_dict[line])
-                dataset[i]['path'].append(f"{line}.png")
 
-        return dataset
+        for line in self._split_lines(os.path.join(pt_path, f"{split}.txt")):
+            yield line, os.path.join(img_path, f"{line}.png"), gt_dict[line]
 
-    def _init_dataset(self):
-        """Initialize the dataset dictionary with empty lists for train subsets, valid, and test"""
-        return {
-            "train_100": {"path": [], "dt": [], "gt": []},  # 100% of training data
-            "train_75": {"path": [], "dt": [], "gt": []},  # 75% of training data
-            "train_50": {"path": [], "dt": [], "gt": []},  # 50% of training data
-            "train_25": {"path": [], "dt": [], "gt": []},  # 25% of training data
-            "valid": {"path": [], "dt": [], "gt": []},  # Validation data
-            "test": {"path": [], "dt": [], "gt": []}  # Test data
-        }
-
-    def save_partitions(self, target_dir, image_input_size, max_text_length):
+    def save_partitions(self, target_dir, image_input_size, max_text_length, batch_size=1024, max_in_flight=4,
+                        compression="gzip:9", chunk_lines=None, pack_images=False, outputs=(), pool=None):
         """
         Save images and sentences from dataset into a single HDF5 file,
         including different subsets of the training set (100%, 75%, 50%, 25%).
+        The 75%, 50% and 25% subsets are stored as virtual datasets over the first rows of 'train_100',
+        so readers open them like any other partition without the images being written four times.
+
+        Images are preprocessed by a single worker pool that lives for the whole build and are
+        streamed, in order, into one HDF5 handle that stays open until every partition is written.
+        Lines are read lazily from the dataset reader, so memory stays bounded by the batch size
+        (plus one manifest record per line) whatever the size of the corpus.
+
+        Extra model inputs (`outputs`, e.g., `utils.outputs.TrOCRPixels()`) are derived from the same
+        image decode as the Flor tensor and written to memory-mappable `.npy` stores next to the HDF5 file.
+
+        A manifest next to the HDF5 file records every line (image stat and hash, ground truth hash).
+        On a rebuild only new or changed lines are preprocessed: when the line layout is unchanged they
+        are patched in place, otherwise the file is rebuilt copying the unchanged images from the old one.
+
+        :param target_dir: Directory where the HDF5 file will be created.
+        :param image_input_size: The size of the input image (width, height, channels).
+        :param max_text_length: Maximum text length for the ground truth labels.
+        :param batch_size: Number of lines sent to the pool per batch.
+        :param max_in_flight: Maximum number of batches queued on the pool at any time.
+        :param compression: Codec of the stored datasets ('none', 'lzf', 'gzip:N', or 'zstd'/'blosc:...' when
+                            hdf5plugin is installed), see `utils.hdf5_layout`.
+        :param chunk_lines: Lines per image chunk, e.g. the consumer batch size (16 for Flor); None lets h5py choose.
+        :param pack_images: Also pack the original PNG bytes into one archive next to the HDF5 file (see
+                            `utils.image_archive`), so consumers of the raw images read a single file.
+        :param outputs: Extra model inputs to produce, see `utils.outputs`. Each line of a store is much larger than
+                        a `dt` row (384x384 float16 for TrOCR), so a smaller `batch_size` keeps the pool's memory low.
+        :param pool: Worker pool shared with other builds (e.g., several datasets saved concurrently from threads).
+                     It must have been created before any HDF5 file was opened. None creates one for this build.
         """
 
         # Ensure the directory exists (this creates only the directory, not the file)
@@ -173,162 +180,467 @@ class Dataset:
         # Generate the filename based on the dataset name (e.g., bentham_dataset.hdf5)
         filename = f"{self.name}_dataset.hdf5"
         target = os.path.join(target_dir, filename)
-
-        if os.path.exists(target):
-            # Check if file contents are the same before overwriting
-            if self._check_existing_file(target):
+        manifest_file = mf.manifest_path(target)
+
+        layout = {'compression': compression, 'chunk_lines': chunk_lines}
+        if pack_images:
+            layout['pack_images'] = True
+        params = {'image_input_size': list(image_input_size), 'max_text_length': max_text_length, **layout}
+        outputs = list(outputs)
+        if outputs:
+            params['outputs'] = [output.params() for output in outputs]
+
+        # Images preprocessed with other parameters (or for other outputs) can't be reused at all
+        previous = mf.load_manifest(manifest_file) if os.path.exists(target) else None
+        if previous and any(previous['params'].get(key) != params.get(key) for key in ['image_input_size',
+                                                                                       'max_text_length',
+                                                                                       'outputs']):
+            previous = None
+
+        previous_index = mf.index_records(previous)
+        records = {pt: mf.build_records(((image_path, text) for _, image_path, text in self.lines(pt)),
+                                        previous_index)
+                   for pt in self.stored_partitions}
+        self.subset_sizes = self._subset_sizes(len(records['train_100']))
+
+        start_time = time.time()
+
+        # A file stored with another codec or chunking is rewritten, copying the images it already holds
+        if previous and previous['params'] == params and self._same_layout(previous['partitions'], records) \
+                and self._sidecars_exist(target, pack_images, outputs):
+            image_rows, gt_rows = self._changed_rows(previous['partitions'], records)
+
+            if not any(image_rows.values()) and not any(gt_rows.values()):
+                mf.save_manifest(manifest_file, params, records)  # Refresh the stats of touched files
                 print(f"{filename} already exists with the same content, skipping.")
-                return  # Skip saving if the data is identical
-
+                return
+
+            if self._patch_file(target, records, image_rows, gt_rows, image_input_size, max_text_length,
+                                batch_size, max_in_flight, outputs, pool):
+                mf.save_manifest(manifest_file, params, records)
+                patched = sum(len(set(image_rows[pt]) | set(gt_rows[pt])) for pt in self.stored_partitions)
+                print(f"Patched {patched} changed lines in {filename} in {time.time() - start_time:.2f} seconds")
+                return
+
+        # Full (re)build: lines whose image is unchanged are copied from the previous file
+        reused = self._reusable_rows(previous_index, records) if previous else {pt: [] for pt in records}
+        self._build_file(target, records, reused, image_input_size, max_text_length, batch_size, max_in_flight,
+                         layout, outputs, pool)
+        mf.save_manifest(manifest_file, params, records)
+
+        total_lines = sum(len(records[pt]) for pt in self.stored_partitions)
+        processed_lines = total_lines - sum(len(reused[pt]) for pt in self.stored_partitions)
+        elapsed_time = time.time() - start_time
+        lines_per_sec = processed_lines / elapsed_time if elapsed_time > 0 else float('inf')
+        print(f"Saved {total_lines} lines to {filename} ({processed_lines} preprocessed, "
+              f"{total_lines - processed_lines} reused) in {elapsed_time:.2f} seconds ({lines_per_sec:.1f} lines/sec)")
+
+    def _full_image_path(self):
+        """Directory holding the line images of the dataset"""
         if self.name == 'bentham':
-            full_image_path = os.path.join(self.source, "Images", "Lines")  # Adjust based on dataset type
+            return os.path.join(self.source, "Images", "Lines")  # Adjust based on dataset type
         elif self.name == 'washington':
-            full_image_path = os.path.join(self.source, "data", "line_images_normalized")
+            return os.path.join(self.source, "data", "line_images_normalized")
+        return os.path.join(self.source, "lines")
+
+    def _sidecars_exist(self, target, pack_images, outputs):
+        """Check that the files stored next to the HDF5 file (image archive, output stores) are all there"""
+        paths = [ia.archive_path(target)] if pack_images else []
+        paths += [out.store_path(target, output.name, pt) for output in outputs for pt in self.stored_partitions]
+        return all(os.path.exists(path) for path in paths)
+
+    @staticmethod
+    @contextmanager
+    def _worker_pool(pool):
+        """Use the shared pool when there is one, otherwise a pool dedicated to the block"""
+        if pool is not None:
+            yield pool
         else:
-            full_image_path = os.path.join(self.source, "lines")
-
-            # Create the HDF5 file at the target location (this includes the filename)
-        with h5py.File(target, "w") as hf:
-            hf.attrs['full_image_path'] = full_image_path.encode('utf-8')
-
-            # Save all subsets of the training data
-            for subset in ['train_100', 'train_75', 'train_50', 'train_25']:
-                self._save_subset(hf, subset, len(self.dataset[subset]['dt']), image_input_size, max_text_length)
-
-            # Save validation and test sets
-            self._save_subset(hf, 'valid', len(self.dataset['valid']['dt']), image_input_size, max_text_length)
-            self._save_subset(hf, 'test', len(self.dataset['test']['dt']), image_input_size, max_text_length)
-
-        pbar = tqdm(total=len(self.partitions))
-        batch_size = 1024
-
-        # Parallel image processing for train, valid, and test partitions
-        for pt in self.partitions:
-            for batch in range(0, len(self.dataset[pt]['gt']), batch_size):
-                images = []
-
-                with multiprocessing.Pool(multiprocessing.cpu_count()) as pool:
-                    r = pool.map(partial(pp.preprocess, input_size=image_input_size),
-                                 self.dataset[pt]['dt'][batch:batch + batch_size])
-                    images.append(r)
-                    pool.close()
-                    pool.join()
-
-                with h5py.File(target, "a") as hf:
-                    hf[f"{pt}/dt"][batch:batch + batch_size] = images
-                    hf[f"{pt}/gt"][batch:batch + batch_size] = [s.encode() for s in
-                                                                self.dataset[pt]['gt'][batch:batch + batch_size]]
-                    hf[f"{pt}/path"][batch:batch + batch_size] = [os.path.basename(path).encode('utf-8') for path in
-                                                                  self.dataset[pt]['dt'][batch:batch + batch_size]]
-                    pbar.update(batch_size)
-
-    def _save_subset(self, hf, partition, subset_size, image_input_size, max_text_length):
+            with multiprocessing.Pool(multiprocessing.cpu_count()) as own_pool:
+                yield own_pool
+
+    def _build_file(self, target, records, reused, image_input_size, max_text_length, batch_size, max_in_flight,
+                    layout, outputs, pool):
+        """
+        Write the whole HDF5 file into a temporary file and move it over `target` once complete.
+
+        :param target: Path of the HDF5 file.
+        :param records: {partition: manifest records} of the lines to store.
+        :param reused: {partition: [(row, previous partition, previous row)]} images copied from `target`.
+        :param layout: {'compression': codec, 'chunk_lines': lines per image chunk, 'pack_images': bool}
+                       of the new file.
+        :param outputs: Extra model inputs, each written to one store per stored partition.
+        :param pool: Shared worker pool, or None for a dedicated one.
+        """
+        tmp_target = f"{target}.tmp"
+        pack_images = layout.get('pack_images', False)
+        archive, tmp_archive = ia.archive_path(target), f"{ia.archive_path(target)}.tmp"
+        pending_rows = {pt: sorted(set(range(len(records[pt]))) - {row for row, _, _ in reused[pt]})
+                        for pt in self.stored_partitions}
+        store_paths = {pt: [out.store_path(target, output.name, pt) for output in outputs]
+                       for pt in self.stored_partitions}
+        pbar = tqdm(total=sum(len(rows) for rows in pending_rows.values()))
+
+        # Create the pool before opening the HDF5 files so the workers never inherit an open handle
+        with self._worker_pool(pool) as pool, h5py.File(tmp_target, "w") as hf:
+            hf.attrs['full_image_path'] = self._full_image_path().encode('utf-8')
+            for output in outputs:
+                hf.attrs[f"{output.name}_params"] = json.dumps(output.params())
+
+            stores = {pt: [out.create_store(f"{path}.tmp", output, len(records[pt]))
+                           for path, output in zip(store_paths[pt], outputs)]
+                      for pt in self.stored_partitions}
+
+            # Create every stored partition up front (full train set, valid and test) and fill in its labels
+            for pt in self.stored_partitions:
+                self._save_subset(hf, pt, len(records[pt]), image_input_size,
+                                  *self._label_widths(pt, max_text_length), **layout)
+                self._write_labels(hf, pt, max_text_length, batch_size)
+
+            # The smaller train subsets only point at the first rows of 'train_100'
+            for subset, subset_size in self.subset_sizes.items():
+                self._save_view(hf, subset, 'train_100', subset_size)
+
+            if any(reused.values()):
+                with h5py.File(target, "r") as previous_hf:
+                    previous_dt = {pt: previous_hf[f"{pt}/dt"] for pt in self.stored_partitions if pt in previous_hf}
+                    for pt in self.stored_partitions:
+                        self._copy_rows(previous_dt, hf[f"{pt}/dt"], reused[pt], batch_size)
+
+                # Reuse implies the previous build produced the same outputs
+                for i, output in enumerate(outputs):
+                    previous_stores = {pt: out.open_store(out.store_path(target, output.name, pt))
+                                       for pt in self.stored_partitions}
+                    for pt in self.stored_partitions:
+                        self._copy_rows(previous_stores, stores[pt][i], reused[pt], batch_size)
+
+            # Pack the original PNG bytes; the images to preprocess are then decoded from the archive
+            if pack_images:
+                self._pack_images(hf, records, tmp_archive, batch_size)
+                hf.attrs['image_archive'] = os.path.basename(archive)
+
+            # Stream the preprocessed images of each stored partition into its `dt` dataset
+            self._write_images(pool, hf, records, pending_rows, image_input_size, batch_size, max_in_flight, pbar,
+                               archive=tmp_archive if pack_images else None, outputs=outputs, stores=stores)
+
+            for pt_stores in stores.values():
+                for store in pt_stores:
+                    store.flush()
+            del stores
+
+        pbar.close()
+        for path in sum(store_paths.values(), []):
+            os.replace(f"{path}.tmp", path)
+        if pack_images:
+            os.replace(tmp_archive, archive)
+        elif os.path.exists(archive):
+            os.remove(archive)  # Left over from a previous packed build
+        os.replace(tmp_target, target)
+
+    def _patch_file(self, target, records, image_rows, gt_rows, image_input_size, max_text_length, batch_size,
+                    max_in_flight, outputs, pool):
+        """
+        Rewrite only the changed rows of an existing HDF5 file with the same line layout.
+        Return False (leaving the file untouched) if a new ground truth doesn't fit a fixed-width string dataset.
+        With a packed archive, changed images are appended to it and their index entries updated
+        (the old bytes stay in the archive until the next full rebuild).
+        """
+        # Only the changed labels are kept in memory
+        labels = dict()
+        for pt, rows in gt_rows.items():
+            wanted = set(rows)
+            labels[pt] = {row: text.encode('utf-8')[:max_text_length]
+                          for row, (_, _, text) in enumerate(self.lines(pt)) if row in wanted}
+
+        with h5py.File(target, "r") as hf:
+            for pt, pt_labels in labels.items():
+                string_info = h5py.check_string_dtype(hf[f"{pt}/gt"].dtype)
+                width = string_info.length if string_info else None
+                if width is not None and any(len(label) > width for label in pt_labels.values()):
+                    return False
+
+        with h5py.File(target, "a") as hf:
+            for pt, pt_labels in labels.items():
+                for row, label in pt_labels.items():
+                    hf[f"{pt}/gt"][row] = label
+
+        # Only spin up workers when some images actually changed
+        if any(image_rows.values()):
+            pbar = tqdm(total=sum(len(rows) for rows in image_rows.values()))
+            with self._worker_pool(pool) as pool, h5py.File(target, "a") as hf:
+                archive = None
+                if 'image_archive' in hf.attrs:
+                    archive = os.path.join(os.path.dirname(target), hf.attrs['image_archive'])
+                    with open(archive, 'ab') as file:
+                        for pt, rows in image_rows.items():
+                            if rows:
+                                offsets, lengths = ia.append_files(file, [records[pt][i][mf.PATH] for i in rows])
+                                self._write_rows(hf[f"{pt}/png_offset"], rows, offsets)
+                                self._write_rows(hf[f"{pt}/png_length"], rows, lengths)
+
+                stores = {pt: [out.open_store(out.store_path(target, output.name, pt), mode='r+') for output in outputs]
+                          for pt in self.stored_partitions}
+                self._write_images(pool, hf, records, image_rows, image_input_size, batch_size, max_in_flight,
+                                   pbar, archive=archive, outputs=outputs, stores=stores)
+
+                for pt_stores in stores.values():
+                    for store in pt_stores:
+                        store.flush()
+            pbar.close()
+
+        return True
+
+    def _write_images(self, pool, hf, records, rows, image_input_size, batch_size, max_in_flight, pbar,
+                      archive=None, outputs=(), stores=None):
+        """
+        Preprocess the given rows of each partition and write them into its `dt` dataset
+        (and into the stores of the extra outputs, from the same image decode).
+
+        :param records: {partition: manifest records}, giving the image path of every row.
+        :param rows: {partition: sorted list of row indices to preprocess}.
+        :param archive: Packed image archive indexed by `png_offset`/`png_length`, read instead of the image files.
+        :param outputs: Extra model inputs.
+        :param stores: {partition: [store of each output]}.
         """
-        Save a subset of the partition (train_100, train_75, train_50, train_25, valid, test).
+        packed = ia.open_archive(archive) if archive else None
+
+        for pt, pt_rows in rows.items():
+            dt = hf[f"{pt}/dt"]
+            if packed is not None:
+                sources = ia.PackedImages(packed, hf[f"{pt}/png_offset"][:][pt_rows],
+                                          hf[f"{pt}/png_length"][:][pt_rows])
+            else:
+                sources = [records[pt][i][mf.PATH] for i in pt_rows]
+
+            for start, (images, extra) in self._stream_preprocessed(pool, sources, image_input_size, batch_size,
+                                                                    max_in_flight, outputs):
+                batch_rows = pt_rows[start:start + len(images)]
+                self._write_rows(dt, batch_rows, images)
+                for store, values in zip(stores[pt] if stores else [], extra):
+                    self._write_rows(store, batch_rows, values)
+                pbar.update(len(images))
+
+        if packed:
+            packed.close()
+
+    def _pack_images(self, hf, records, archive, batch_size):
+        """
+        Write the original image files of every stored partition into a new archive and index them.
 
         :param hf: HDF5 file handler.
-        :param partition: 'train_100', 'train_75', 'train_50', 'train_25', 'valid', 'test'.
-        :param subset_size: The number of elements to include in the subset.
-        :param image_input_size: The size of the input image (height, width, channels).
+        :param records: {partition: manifest records}, giving the image path of every row.
+        :param archive: Path of the archive to create.
+        :param batch_size: Number of images indexed at a time.
+        """
+        with open(archive, 'wb') as file:
+            for pt in self.stored_partitions:
+                for start in range(0, len(records[pt]), batch_size):
+                    paths = [record[mf.PATH] for record in records[pt][start:start + batch_size]]
+                    offsets, lengths = ia.append_files(file, paths)
+                    hf[f"{pt}/png_offset"][start:start + len(paths)] = offsets
+                    hf[f"{pt}/png_length"][start:start + len(paths)] = lengths
+
+    def _label_widths(self, partition, max_text_length):
+        """
+        Byte widths of the fixed-length `gt` and `path` datasets of a partition: its longest (truncated) label
+        and its longest file name. A patched label longer than the width makes `_patch_file` rebuild the file.
+        """
+        gt_width, path_width = 1, 1
+        for _, image_path, text in self.lines(partition):
+            gt_width = max(gt_width, len(text.encode('utf-8')[:max_text_length]))
+            path_width = max(path_width, len(os.path.basename(image_path).encode('utf-8')))
+        return gt_width, path_width
+
+    def _write_labels(self, hf, partition, max_text_length, batch_size):
+        """
+        Stream the ground truth and file names of a partition into its `gt` and `path` datasets.
+
+        :param hf: HDF5 file handler.
+        :param partition: 'train_100', 'valid', 'test'.
         :param max_text_length: Maximum text length for the ground truth labels.
+        :param batch_size: Number of lines written at a time.
         """
-        size = (subset_size,) + image_input_size[:2]
+        gt, path = hf[f"{partition}/gt"], hf[f"{partition}/path"]
+        lines = self.lines(partition)
+        start = 0
+
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch:
+                break
+            if start + len(batch) > len(gt):
+                raise RuntimeError(f"The '{partition}' lines of {self.name} changed while the file was being built.")
+
+            gt[start:start + len(batch)] = [text.encode('utf-8')[:max_text_length] for _, _, text in batch]
+            path[start:start + len(batch)] = [os.path.basename(image_path).encode('utf-8')
+                                              for _, image_path, _ in batch]
+            start += len(batch)
+
+        if start != len(gt):
+            raise RuntimeError(f"The '{partition}' lines of {self.name} changed while the file was being built.")
+
+    @staticmethod
+    def _write_rows(dataset, rows, data):
+        """Write `data` into sorted `rows` of an HDF5 dataset, as a slice when the rows are contiguous"""
+        if rows[-1] - rows[0] + 1 == len(rows):
+            dataset[rows[0]:rows[-1] + 1] = data
+        else:
+            dataset[rows] = data
 
-        # Create dummy image data for testing purposes (replace with actual preprocessed images)
-        dummy_image = np.zeros(size, dtype=np.uint8)
+    def _copy_rows(self, previous, target, reused, batch_size):
+        """
+        Copy unchanged images (or output rows) from the previous build.
 
-        # Get the actual ground truth data from the dataset
-        ground_truth = [gt.encode('utf-8')[:max_text_length] for gt in self.dataset[partition]['gt'][:subset_size]]
+        :param previous: {previous partition: array-like of the previous build} (HDF5 `dt` datasets or output stores).
+        :param target: Array-like of the new build receiving the rows.
+        :param reused: [(row, previous partition, previous row)].
+        """
+        by_partition = dict()
+        for row, previous_pt, previous_row in reused:
+            by_partition.setdefault(previous_pt, []).append((previous_row, row))
+
+        for previous_pt, pairs in by_partition.items():
+            pairs.sort()
+            for start in range(0, len(pairs), batch_size):
+                batch = pairs[start:start + batch_size]
+                images = previous[previous_pt][[previous_row for previous_row, _ in batch]]
+
+                # HDF5 point selections must be increasing on both sides
+                order = np.argsort([row for _, row in batch])
+                self._write_rows(target, [batch[i][1] for i in order], images[order])
+
+    def _same_layout(self, previous, records):
+        """Check that every stored partition holds the same image paths in the same order"""
+        return all(pt in previous and [r[mf.PATH] for r in previous[pt]] == [r[mf.PATH] for r in records[pt]]
+                   for pt in self.stored_partitions)
+
+    def _changed_rows(self, previous, records):
+        """Return the rows whose image content changed and the rows whose ground truth changed"""
+        image_rows, gt_rows = dict(), dict()
+
+        for pt in self.stored_partitions:
+            pairs = list(zip(previous[pt], records[pt]))
+            image_rows[pt] = [i for i, (old, new) in enumerate(pairs) if old[mf.IMAGE_HASH] != new[mf.IMAGE_HASH]]
+            gt_rows[pt] = [i for i, (old, new) in enumerate(pairs) if old[mf.GT_HASH] != new[mf.GT_HASH]]
+
+        return image_rows, gt_rows
+
+    def _reusable_rows(self, previous_index, records):
+        """Map rows whose image is unchanged to their position in the previous HDF5 file"""
+        reused = dict()
+
+        for pt in self.stored_partitions:
+            reused[pt] = []
+            for row, record in enumerate(records[pt]):
+                previous = previous_index.get(record[mf.PATH])
+                if previous and previous[2][mf.IMAGE_HASH] == record[mf.IMAGE_HASH]:
+                    reused[pt].append((row, previous[0], previous[1]))
+
+        return reused
+
+    @staticmethod
+    def _stream_preprocessed(pool, paths, image_input_size, batch_size, max_in_flight, outputs=()):
+        """
+        Preprocess images on the pool and yield them back in their original order.
+        Every batch is split into one task per worker; each task decodes its images once and fills a single
+        (n, W, H) uint8 buffer plus one buffer per extra output (`pp.preprocess_targets`), written as is.
+
+        :param pool: Long-lived multiprocessing pool.
+        :param paths: Image paths to preprocess.
+        :param image_input_size: The size of the input image (width, height, channels).
+        :param batch_size: Number of paths per batch.
+        :param max_in_flight: Maximum number of batches queued on the pool at any time.
+        :param outputs: Extra model inputs computed from the same decode.
+        :return: Generator of (start index, (uint8 array of preprocessed images, [array of each output])).
+        """
+        preprocess = partial(pp.preprocess_targets, input_size=image_input_size, outputs=outputs)
+        task_size = -(-batch_size // multiprocessing.cpu_count())
+        pending = deque()
+
+        def results(start, result):
+            for images, extra in result.get():
+                yield start, (images, extra)
+                start += len(images)
+
+        for start in range(0, len(paths), batch_size):
+            batch = paths[start:start + batch_size]
+            tasks = [batch[i:i + task_size] for i in range(0, len(batch), task_size)]
+            pending.append((start, pool.map_async(preprocess, tasks, chunksize=1)))
+
+            # Bound the amount of work (and memory) queued ahead of the writer
+            if len(pending) >= max_in_flight:
+                yield from results(*pending.popleft())
+
+        while pending:
+            yield from results(*pending.popleft())
+
+    @staticmethod
+    def _save_subset(hf, partition, subset_size, image_input_size, gt_width, path_width, compression="gzip:9",
+                     chunk_lines=None, pack_images=False):
+        """
+        Create the datasets of a stored partition (train_100, valid, test).
 
-        # Get the file names (paths)
-        file_names = [os.path.basename(path).encode('utf-8') for path in self.dataset[partition]['dt'][:subset_size]]
+        :param hf: HDF5 file handler.
+        :param partition: 'train_100', 'valid', 'test'.
+        :param subset_size: The number of elements to include in the subset.
+        :param image_input_size: The size of the input image (height, width, channels).
+        :param gt_width: Bytes of the fixed-length ground truth strings (see `_label_widths`).
+        :param path_width: Bytes of the fixed-length file names.
+        :param compression: Codec name, see `utils.hdf5_layout.compression_options`.
+        :param chunk_lines: Lines per image chunk (None for automatic chunking).
+        :param pack_images: Also create the `png_offset`/`png_length` index of the packed image archive.
+        """
+        size = (subset_size,) + image_input_size[:2]
+        options = hdf5_layout.compression_options(compression)
 
-        # Get the full paths
-        full_paths = [path.encode('utf-8') for path in self.dataset[partition]['dt'][:subset_size]]
+        # Images and labels are filled in later by the streaming writers (or copied from a previous build)
+        hf.create_dataset(f"{partition}/dt", shape=size, dtype=np.uint8,
+                          chunks=hdf5_layout.chunk_shape(size, chunk_lines), **options)
+        hf.create_dataset(f"{partition}/gt", shape=(subset_size,), dtype=f"S{gt_width}", **options)
+        hf.create_dataset(f"{partition}/path", shape=(subset_size,), dtype=f"S{path_width}", **options)
 
-        # Save the data into the HDF5 file
-        hf.create_dataset(f"{partition}/dt", data=dummy_image, compression="gzip", compression_opts=9)
-        hf.create_dataset(f"{partition}/gt", data=ground_truth, compression="gzip", compression_opts=9)
-        hf.create_dataset(f"{partition}/path", data=file_names, compression="gzip", compression_opts=9)
+        if pack_images:
+            hf.create_dataset(f"{partition}/png_offset", shape=(subset_size,), dtype=np.int64, **options)
+            hf.create_dataset(f"{partition}/png_length", shape=(subset_size,), dtype=np.int64, **options)
 
-    def _check_existing_file(self, target):
-        """
-        Check if the content of the existing HDF5 file matches the current dataset.
-        Return True if content is identical, otherwise False.
+    @staticmethod
+    def _save_view(hf, subset, source_partition, subset_size):
         """
-        with h5py.File(target, 'r') as hf:
-            for subset in self.partitions:
-                if subset not in hf:
-                    return False  # The partition doesn't exist, so the content is different
-
-                # Compare lengths
-                if len(hf[f"{subset}/dt"]) != len(self.dataset[subset]['dt']):
-                    return False
+        Save a train subset as virtual datasets over the first `subset_size` rows of another partition.
 
-                # Compare file paths (assuming paths are unique identifiers)
-                existing_paths = [path.decode('utf-8') for path in hf[f"{subset}/path"]]
-                current_paths = [os.path.basename(path) for path in self.dataset[subset]['dt']]
-                if existing_paths != current_paths:
-                    return False
+        :param hf: HDF5 file handler.
+        :param subset: 'train_75', 'train_50', 'train_25'.
+        :param source_partition: Partition holding the actual data (e.g., 'train_100').
+        :param subset_size: The number of leading rows included in the subset.
+        """
+        for key in hf[source_partition]:
+            source = hf[f"{source_partition}/{key}"]
+            layout = h5py.VirtualLayout(shape=(subset_size,) + source.shape[1:], dtype=source.dtype)
+            # '.' makes the view resolve against the file that contains it, wherever that file is moved
+            layout[:] = h5py.VirtualSource('.', source.name, shape=source.shape)[:subset_size]
+            hf.create_virtual_dataset(f"{subset}/{key}", layout)
 
-        return True  # Data matches, no need to overwrite
+        # Lets readers of data stored outside the HDF5 file (e.g., output stores) find the rows of the subset
+        hf[subset].attrs['source_partition'] = source_partition
 
-    def _iam(self, partition_name):
+    def _iam(self, split):
         """IAM dataset reader"""
         pt_path = os.path.join(self.source, "largeWriterIndependentTextLineRecognitionTask")
-
-        # Load paths for train, valid, and test sets
-        paths = {
-            "train": open(os.path.join(pt_path, "trainset.txt")).read().splitlines(),
-            "valid": open(os.path.join(pt_path, "validationset1.txt")).read().splitlines() +
-                     open(os.path.join(pt_path, "validationset2.txt")).read().splitlines(),
-            "test": open(os.path.join(pt_path, "testset.txt")).read().splitlines()
+        split_files = {
+            "train": ["trainset.txt"],
+            "valid": ["validationset1.txt", "validationset2.txt"],
+            "test": ["testset.txt"]
         }
 
-        lines_path = os.path.join(self.source, "ground_truth", "lines.txt")
-
-        if not os.path.exists(lines_path):
-            raise FileNotFoundError(f"Ground truth file does not exist: {lines_path}")
-
-        lines = open(lines_path).read().splitlines()
-        dataset = {
-            "train": {"path": [], "dt": [], "gt": []},
-            "valid": {"path": [], "dt": [], "gt": []},
-            "test": {"path": [], "dt": [], "gt": []}
-        }
-        gt_dict = {}
+        # Load transcriptions (ground truth)
+        gt_dict = self._ground_truth(gt_index.iam_index)
 
-        # Process the ground truth lines
-        for line in lines:
-            if not line or line.startswith("#"):
+        for line in self._split_lines(*[os.path.join(pt_path, f) for f in split_files[split]]):
+            # Skip missing ground truth entries
+            if line not in gt_dict:
+                self._warn(f"Warning: Missing ground truth for {line}")
                 continue
-            split = line.split()
-            corrected_gt = correct_punctuation_spacing(" ".join(split[8:]).replace("|", " "))
-            gt_dict[split[0]] = corrected_gt
-
-        # Process the IAM dataset for train, valid, and test partitions
-        for i in ["train", "valid", "test"]:
-            for line in paths[i]:
-                try:
-                    split = line.split("-")
-                    img_file = f"{split[0]}-{split[1]}-{split[2]}.png"
-                    img_path = os.path.join(self.source, "lines", img_file)
-                    # print(img_path)
-
-                    # Skip missing ground truth entries
-                    if line not in gt_dict:
-                        print(f"Warning: Missing ground truth for {line}")
-                        continue
-
-                    dataset[i]['gt'].append(gt_dict[line])
-                    dataset[i]['dt'].append(img_path)
-                # except KeyError:
-                    # print(f"Warning: KeyError processing line {line}")
-                except Exception:
-                    pass
-
-        # Ensure that training data exists
-        if not dataset['train']['dt']:
-            raise ValueError("No training data found for IAM dataset. Please check your files.")
-
-        return dataset
+
+            split_id = line.split("-")
+            img_file = f"{split_id[0]}-{split_id[1]}-{split_id[2]}.png"
+            yield line, os.path.join(self.source, "lines", img_file), gt_dict[line]
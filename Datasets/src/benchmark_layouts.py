@@ -0,0 +1,112 @@
+# benchmark_layouts.py
+
+"""
+Read-throughput benchmark of HDF5 storage layouts for the training generators.
+
+A partition of an existing dataset file is rewritten once per (codec, chunking) layout, then read
+the way Flor's `DataGenerator` does:
+    load:   whole partition at once (`DataGenerator(stream=False)` initialisation)
+    stream: consecutive `batch_size` windows, as `next_train_batch` issues them with `stream=True`
+    random: the same windows in shuffled order (random batch access)
+
+Usage: python benchmark_layouts.py [dataset_name] [partition] [batch_size]
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import h5py
+import numpy as np
+
+from constants import splits_bentham_path, splits_washington_path, splits_iam_path
+from utils import hdf5_layout
+
+DATASET_PATHS = {
+    'bentham': splits_bentham_path,
+    'washington': splits_washington_path,
+    'iam': splits_iam_path
+}
+
+
+def write_layout(images, labels, target, codec, chunk_lines):
+    """Write a partition with the given layout and return the time it took"""
+    options = hdf5_layout.compression_options(codec)
+    start_time = time.time()
+
+    with h5py.File(target, "w") as hf:
+        hf.create_dataset("dt", data=images, chunks=hdf5_layout.chunk_shape(images.shape, chunk_lines), **options)
+        hf.create_dataset("gt", data=labels, **options)
+
+    return time.time() - start_time
+
+
+def read_batches(target, batch_size, order):
+    """Read the `batch_size` windows starting at `order` (like `next_train_batch`) and return the elapsed time"""
+    start_time = time.time()
+
+    with h5py.File(target, "r") as hf:
+        dt, gt = hf["dt"], hf["gt"]
+        for index in order:
+            dt[index:index + batch_size]
+            gt[index:index + batch_size]
+
+    return time.time() - start_time
+
+
+def read_all(target):
+    """Load the whole partition into memory and return the elapsed time"""
+    start_time = time.time()
+
+    with h5py.File(target, "r") as hf:
+        np.array(hf["dt"])
+        np.array(hf["gt"])
+
+    return time.time() - start_time
+
+
+def run_benchmark(hdf5_path, partition, batch_size):
+    with h5py.File(hdf5_path, "r") as hf:
+        images = hf[f"{partition}/dt"][:]
+        labels = hf[f"{partition}/gt"][:]
+
+    total_mb = images.nbytes / (1024 * 1024)
+    starts = np.arange(0, len(images), batch_size)
+    shuffled = np.random.default_rng(42).permutation(starts)
+    print(f"{hdf5_path} [{partition}]: {len(images)} lines, {total_mb:.1f} MB raw, batch size {batch_size}")
+
+    header = f"{'codec':<14}{'chunks':>8}{'size MB':>9}{'write s':>9}" \
+             f"{'load MB/s':>11}{'stream MB/s':>13}{'stream b/s':>12}{'random MB/s':>13}{'random b/s':>12}"
+    print(header)
+    print("-" * len(header))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for codec in hdf5_layout.available_codecs():
+            for chunk_lines in [None, batch_size]:
+                if codec == "none" and chunk_lines is None:
+                    label = "contig"
+                else:
+                    label = "auto" if chunk_lines is None else str(chunk_lines)
+
+                target = os.path.join(tmp_dir, "layout.hdf5")
+                write_time = write_layout(images, labels, target, codec, chunk_lines)
+                size_mb = os.path.getsize(target) / (1024 * 1024)
+
+                load_time = read_all(target)
+                stream_time = read_batches(target, batch_size, starts)
+                random_time = read_batches(target, batch_size, shuffled)
+
+                print(f"{codec:<14}{label:>8}{size_mb:>9.1f}{write_time:>9.2f}"
+                      f"{total_mb / load_time:>11.1f}"
+                      f"{total_mb / stream_time:>13.1f}{len(starts) / stream_time:>12.1f}"
+                      f"{total_mb / random_time:>13.1f}{len(starts) / random_time:>12.1f}")
+                os.remove(target)
+
+
+if __name__ == '__main__':
+    name_dataset = sys.argv[1] if len(sys.argv) > 1 else 'washington'
+    partition_name = sys.argv[2] if len(sys.argv) > 2 else 'train_100'
+    batch = int(sys.argv[3]) if len(sys.argv) > 3 else 16  # HTRFlorConfig.BATCH_SIZE
+
+    run_benchmark(os.path.join(DATASET_PATHS[name_dataset], f"{name_dataset}_dataset.hdf5"), partition_name, batch)
@@ -0,0 +1,88 @@
+# benchmark_preproc.py
+
+"""
+Micro-benchmark of the line preprocessing kernel, single process:
+    legacy: the previous per-image `preprocess` (np.unique background, new target + transpose per line),
+            stacked with np.asarray as the pool writer used to do
+    single: the current `pp.preprocess`, one call per image
+    batch:  `pp.preprocess_targets` (no extra outputs), decoding every line into one (N, W, H) buffer
+
+All variants must produce the same buffer; the script checks it before reporting lines/sec.
+
+Usage: python benchmark_preproc.py [dataset_name] [number_of_lines] [repeats]
+"""
+
+import sys
+import time
+from itertools import islice
+
+import cv2
+import numpy as np
+
+from Dataset import Dataset
+from constants import bentham_path, washington_path, iam_path
+from utils import preproc as pp
+
+DATASET_SOURCES = {
+    'bentham': (bentham_path, 'cv1'),
+    'washington': (washington_path, 'cv0'),
+    'iam': (iam_path, 'cv1')
+}
+
+INPUT_SIZE = (1024, 128, 1)
+
+
+def legacy_preprocess(path, input_size):
+    """Previous implementation of `pp.preprocess` for image paths, kept as the baseline"""
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    u, i = np.unique(np.array(img).flatten(), return_inverse=True)
+    bg = int(u[np.argmax(np.bincount(i))])
+
+    wt, ht, _ = input_size
+    h, w = np.asarray(img).shape
+    f = max((w / wt), (h / ht))
+    new_size = (max(min(wt, int(w / f)), 1), max(min(ht, int(h / f)), 1))
+
+    img = cv2.resize(img, new_size)
+    target = np.ones([ht, wt], dtype=np.uint8) * bg
+    target[0:new_size[1], 0:new_size[0]] = img
+    return cv2.transpose(target)
+
+
+def run_benchmark(paths, repeats):
+    variants = {
+        'legacy': lambda: np.asarray([legacy_preprocess(path, INPUT_SIZE) for path in paths], dtype=np.uint8),
+        'single': lambda: np.asarray([pp.preprocess(path, INPUT_SIZE) for path in paths], dtype=np.uint8),
+        'batch': lambda: pp.preprocess_targets(paths, INPUT_SIZE)[0]
+    }
+
+    reference = variants['legacy']()
+    for name, run in variants.items():
+        if not np.array_equal(run(), reference):
+            raise AssertionError(f"'{name}' output differs from the legacy preprocessing")
+
+    print(f"{len(paths)} lines, input size {INPUT_SIZE}, best of {repeats}")
+    print(f"{'variant':<10}{'seconds':>10}{'lines/sec':>12}{'speedup':>10}")
+
+    legacy_time = None
+    for name, run in variants.items():
+        best = float('inf')
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start_time)
+
+        legacy_time = legacy_time or best
+        print(f"{name:<10}{best:>10.3f}{len(paths) / best:>12.1f}{legacy_time / best:>9.2f}x")
+
+
+if __name__ == '__main__':
+    name_dataset = sys.argv[1] if len(sys.argv) > 1 else 'washington'
+    number_of_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    repeat_count = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    source, partition_name = DATASET_SOURCES[name_dataset]
+    dataset = Dataset(source=source, name=name_dataset, partition_name=partition_name)
+    image_paths = [image_path for _, image_path, _ in islice(dataset.lines('train_100'), number_of_lines)]
+
+    run_benchmark(image_paths, repeat_count)
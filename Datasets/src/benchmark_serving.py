@@ -0,0 +1,119 @@
+# benchmark_serving.py
+
+"""
+Load test of the GraphQL API: the same partitionData query sent by concurrent clients for a fixed time,
+reporting requests/sec and latency percentiles for each server URL given.
+
+Compare the development server with the production mode:
+    python flask_main.py                          # http://127.0.0.1:5000
+    gunicorn --bind 127.0.0.1:5001                # from Datasets/src, reads gunicorn.conf.py
+
+    python benchmark_serving.py http://127.0.0.1:5000/graphql http://127.0.0.1:5001/graphql
+
+Options (environment variables): BENCH_SECONDS (default 20), BENCH_CLIENTS (16), BENCH_PERSISTED (1 to send
+the query as a persisted query hash after the first request), and BENCH_DATASET, BENCH_LLM, BENCH_METHOD,
+BENCH_OCR, BENCH_DICT, BENCH_PARTITIONS for the query arguments.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+QUERY = """
+query ($partitions: [String]!, $dataset: String!, $method: String!, $ocr: String!, $dict: String!, $llm: String!) {
+  partitionData(partition: $partitions, nameDataset: $dataset, nameMethod: $method, htrModel: $ocr,
+                dictName: $dict, llmName: $llm, numberOfRows: 10) {
+    totalCount
+    statistics { averageCerOcr averageCerLlm cerReductionPercentage }
+    cerLlmLesserCount
+    data { fileName groundTruth imageUrl }
+    evaluationData(first: 100) { fileName predictedTextOcr predictedTextLlm cerOcr cerLlm }
+  }
+}
+"""
+
+VARIABLES = {
+    'partitions': os.environ.get('BENCH_PARTITIONS', 'train_25,train_50,train_75,train_100').split(','),
+    'dataset': os.environ.get('BENCH_DATASET', 'bentham'),
+    'method': os.environ.get('BENCH_METHOD', 'method_1'),
+    'ocr': os.environ.get('BENCH_OCR', 'Flor_model'),
+    'dict': os.environ.get('BENCH_DICT', 'empty'),
+    'llm': os.environ.get('BENCH_LLM', 'gpt-4o-mini')
+}
+
+
+def post(url, payload):
+    """Send one request; return (status, response size in bytes)"""
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'), method='POST', headers={
+        'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            body = response.read()
+            if response.headers.get('Content-Encoding') == 'gzip':
+                json.loads(gzip.decompress(body))
+            return response.status, len(body)
+    except urllib.error.HTTPError as e:
+        return e.code, 0
+
+
+def run(url, seconds, clients, persisted):
+    """Hammer one URL; return requests/sec, latency percentiles (ms), errors and mean response size"""
+    payload = {'query': QUERY, 'variables': VARIABLES}
+    if persisted:
+        # Register the query once, then send the hash only
+        extensions = {'persistedQuery': {'version': 1, 'sha256Hash': hashlib.sha256(QUERY.encode('utf-8')).hexdigest()}}
+        post(url, dict(payload, extensions=extensions))
+        payload = {'variables': VARIABLES, 'extensions': extensions}
+
+    post(url, payload)  # Warm-up request, not measured
+    latencies, sizes, errors = [], [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status, size = post(url, payload)
+            except OSError:
+                status, size = None, 0
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                    sizes.append(size)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests/sec': round(len(latencies) / seconds, 1),
+        'p50 ms': round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+        'p95 ms': round(float(np.percentile(latencies, 95)), 1) if len(latencies) else None,
+        'errors': errors[0],
+        'bytes': int(np.mean(sizes)) if sizes else 0
+    }
+
+
+if __name__ == '__main__':
+    urls = sys.argv[1:] or ['http://127.0.0.1:5000/graphql']
+    seconds = float(os.environ.get('BENCH_SECONDS', 20))
+    clients = int(os.environ.get('BENCH_CLIENTS', 16))
+    persisted = os.environ.get('BENCH_PERSISTED', '0') == '1'
+
+    for url in urls:
+        print(f"{url}: {run(url, seconds, clients, persisted)}")
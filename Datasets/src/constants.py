@@ -16,6 +16,7 @@ outputs_path = os.path.join(current_dir, '../outputs')
 splits_bentham_path = os.path.join(outputs_path, 'bentham')
 splits_washington_path = os.path.join(outputs_path, 'washington')
 splits_iam_path = os.path.join(outputs_path, 'iam')
+gt_cache_path = os.path.join(outputs_path, 'gt_cache')
 
 evaluations_path = os.path.join(current_dir, '../../TrOCR_model/results')
 llm_outputs_path = os.path.join(current_dir, '../../LLMs/results')
@@ -23,3 +24,6 @@ llm_outputs_path = os.path.join(current_dir, '../../LLMs/results')
 llm_logs_path = os.path.join(current_dir, '../../LLMs/logs')
 llm_logs_file = os.path.join(current_dir, '../../LLMs/src/workflow.log')
 
+
+# Results catalog shared with the LLM batch scripts
+results_catalog_module = os.path.join(current_dir, '../../LLMs/src/utils/results_catalog.py')
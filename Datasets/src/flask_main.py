@@ -1,32 +1,98 @@
 # flask_main.py
 
+"""
+GraphQL API of the datasets and results, served by the Flask development server when run directly:
+
+    cd Datasets/src && python flask_main.py    # FLASK_DEBUG=1 for the debugger and reloader
+
+In production, serve it with gunicorn (see gunicorn.conf.py for the install and launch command).
+flask-compress is optional: without it the responses are sent uncompressed.
+"""
+
 import logging
-from flask import Flask
+import os
+from flask import Flask, Response, abort, jsonify, request
 from flask_cors import CORS
 from graphql_server.flask import GraphQLView
+from my_graphql.persisted_queries import request_payload, execute_payload
 from my_graphql.schema import schema
+from my_graphql.utils.file_handler import DATASET_PATHS, dataset_hdf5_path
+from my_graphql.utils.line_images import IMAGE_FORMATS, get_line_image
 
 # Configure logging for the main module
 logging.basicConfig(level=logging.INFO)
 
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
 # Initialize the Flask app
 app = Flask(__name__)
 
 # Enable CORS for specific route (/graphql) and origin (localhost:4200)
 CORS(app, resources={r"/graphql": {"origins": "http://localhost:4200"}})
-# Add the GraphQL endpoint
-app.add_url_rule(
-    '/graphql',
-    view_func=GraphQLView.as_view(
-        'graphql',
-        schema=schema,
-        graphiql=True  # Enable GraphiQL interface
-    )
+
+# Compress large GraphQL responses (brotli when the client accepts it, else gzip) if flask-compress is installed;
+# line images are already compressed
+if Compress is not None:
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html']
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    Compress(app)
+
+graphql_view = GraphQLView.as_view(
+    'graphql_view',
+    schema=schema,
+    graphiql=True  # Enable GraphiQL interface
 )
 
+
+# Add the GraphQL endpoint
+@app.route('/graphql', methods=['GET', 'POST'])
+def graphql():
+    """
+    Queries (by text or persisted query hash) run on their cached parsed document; the GraphiQL interface
+    and other requests go to the GraphQL view
+    """
+    payload = request_payload(request)
+    if payload is None:
+        return graphql_view()
+
+    result, status = execute_payload(schema, payload, context=request)
+    return jsonify(result), status
+
+
+@app.route('/images/<name_dataset>/<partition>/<int:index>.<image_format>')
+def line_image(name_dataset, partition, index, image_format):
+    """Serve one preprocessed line as PNG/WebP bytes, with a strong ETag and browser caching"""
+    if name_dataset not in DATASET_PATHS or image_format not in IMAGE_FORMATS:
+        abort(404)
+
+    try:
+        image = get_line_image(dataset_hdf5_path(name_dataset), partition, index, image_format)
+    except FileNotFoundError:
+        abort(404)
+    if image is None:
+        abort(404)
+
+    data, etag, version = image
+    response = Response(data, mimetype=IMAGE_FORMATS[image_format][1])
+    response.set_etag(etag)
+
+    # URLs carry the file version: a matching one never changes, anything else must be revalidated
+    if request.args.get('v') == version:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+
+    return response.make_conditional(request)
+
+
 # Run the Flask app
 if __name__ == '__main__':
 
     # Start the Flask app
     logging.info("Running app")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # The debugger runs arbitrary code for whoever reaches the port: only on request
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_DEBUG') == '1')
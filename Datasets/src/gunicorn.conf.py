@@ -0,0 +1,41 @@
+# gunicorn.conf.py
+
+"""
+Production serving of the GraphQL API (flask_main.py runs the development server).
+
+gunicorn is not a dependency of the development server; install it in the Datasets environment, with
+flask-compress optionally (brotli/gzip compression of the GraphQL responses, skipped when it is missing):
+
+    pip install gunicorn
+    pip install flask-compress             # optional
+
+and start the server from the source directory, where this file is picked up:
+
+    cd Datasets/src && gunicorn            # same as: gunicorn -c gunicorn.conf.py
+
+Several worker processes, each with a few threads: the HDF5 reads and results parsing release the GIL
+only partially, so processes give the parallelism and threads overlap the file I/O. Every worker opens
+its own HDF5 handles and warms its caches after the fork (the app is not preloaded in the master).
+Settings can be overridden with the GRAPHQL_* environment variables.
+"""
+
+import multiprocessing
+import os
+
+wsgi_app = 'flask_main:app'
+bind = os.environ.get('GRAPHQL_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GRAPHQL_WORKERS', min(2 * multiprocessing.cpu_count() + 1, 9)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GRAPHQL_THREADS', 4))
+timeout = 120
+keepalive = 5
+preload_app = False
+
+accesslog = '-'
+loglevel = 'info'
+
+
+def post_worker_init(worker):
+    """Preload the dataset, results and log caches before the worker accepts requests"""
+    from my_graphql.warmup import warm_up
+    warm_up()
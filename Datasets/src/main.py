@@ -1,10 +1,13 @@
 # main.py
 
 import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import redis
 from Dataset import Dataset
+from utils.outputs import TrOCRPixels
 from constants import bentham_path, splits_bentham_path, washington_path, splits_washington_path, iam_path, \
-    splits_iam_path
+    splits_iam_path, gt_cache_path
 
 # Configure logging for the main module
 logging.basicConfig(level=logging.INFO)
@@ -12,33 +15,58 @@ logging.basicConfig(level=logging.INFO)
 # Connect to Redis
 r = redis.Redis(host='127.0.0.1', port=6379, db=0)
 
-# Run the Flask app
+# Datasets to build (Washington uses the "cv0" partition)
+DATASETS = [
+    {'name': 'bentham', 'source': bentham_path, 'target_dir': splits_bentham_path, 'partition_name': 'cv1'},
+    {'name': 'washington', 'source': washington_path, 'target_dir': splits_washington_path, 'partition_name': 'cv0'},
+    {'name': 'iam', 'source': iam_path, 'target_dir': splits_iam_path, 'partition_name': 'cv1'}
+]
+
+input_size = (1024, 128, 1)
+max_text_length = 256
+# TrOCR pixel values can be produced from the same decode as the Flor tensors (about 295 KB per line). HandleDataTrOCR
+# only reads them without augmentation (augment=False), which the TrOCR training and evaluation scripts don't use,
+# so they are not built by default; enabling them re-preprocesses every existing dataset file once.
+build_trocr_pixels = False
+outputs = [TrOCRPixels()] if build_trocr_pixels else []
+# Rows with TrOCR pixel values are large, so fewer lines are sent to the pool per batch
+batch_size = 256 if outputs else 1024
+
+
+def build_dataset(config, pool):
+    """
+    Read and save one dataset, then publish its own completion event ("{name}_done").
+
+    :param config: Entry of `DATASETS`.
+    :param pool: Worker pool shared by every dataset build.
+    """
+    dataset = Dataset(source=config['source'], name=config['name'], partition_name=config['partition_name'],
+                      cache_dir=gt_cache_path)
+    dataset.read_partitions()
+    dataset.save_partitions(target_dir=config['target_dir'], image_input_size=input_size,
+                            max_text_length=max_text_length, batch_size=batch_size, outputs=outputs, pool=pool)
+
+    result = r.publish("project_channel", f"{config['name']}_done")
+    logging.info(f"{config['name']} dataset done, message published to Redis with result: {result}")
+
+
 if __name__ == '__main__':
-    # Autoload Bentham dataset if necessary
-    try:
-        # Example usage
-        input_size = (1024, 128, 1)
-        max_text_length = 256
-
-        # Initialize the Dataset class for Bentham
-        bentham_dataset = Dataset(source=bentham_path, name="bentham")
-        bentham_dataset.read_partitions()
-        bentham_dataset.save_partitions(target_dir=splits_bentham_path, image_input_size=input_size,
-                                        max_text_length=max_text_length)
-
-        # Initialize the Dataset class for Washington (partition "cv0")
-        washington_dataset = Dataset(source=washington_path, name="washington", partition_name="cv0")
-        washington_dataset.read_partitions()
-        washington_dataset.save_partitions(target_dir=splits_washington_path, image_input_size=input_size,
-                                           max_text_length=max_text_length)
-
-        # Initialize and process the IAM dataset
-        iam_dataset = Dataset(source=iam_path, name="iam")
-        iam_dataset.read_partitions()
-        iam_dataset.save_partitions(target_dir=splits_iam_path, image_input_size=input_size,
-                                    max_text_length=max_text_length)
+    # Every dataset is built in its own thread, so one corpus parses its ground truth or flushes its HDF5 file
+    # while the others keep the workers busy. A single pool sized to the machine is the global CPU budget;
+    # it is created before any HDF5 file is opened so the workers never inherit an open handle.
+    failed = []
+
+    with multiprocessing.Pool(multiprocessing.cpu_count()) as worker_pool, \
+            ThreadPoolExecutor(max_workers=len(DATASETS)) as executor:
+        futures = {executor.submit(build_dataset, config, worker_pool): config['name'] for config in DATASETS}
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed.append(futures[future])
+                logging.error(f"Error while loading the {futures[future]} dataset: {e}")
 
+    if not failed:
         result = r.publish("project_channel", "datasets_done")
         logging.info(f"Message published to Redis with result: {result}")
-    except Exception as e:
-        logging.error(f"Error while loading the dataset: {e}")
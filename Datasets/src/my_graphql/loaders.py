@@ -0,0 +1,165 @@
+"""
+Lazy data sources behind the PartitionData fields:
+    RequestMemo: values shared by the fields (and partitions) of one request, each loaded at most once
+    PartitionSource: the arguments of one requested partition, and loaders for its rows, results and logs
+    prefetch: start loading what the selected fields of several partitions need, on a bounded thread pool
+
+The root resolver only builds one PartitionSource per partition; every PartitionData field loads what it needs
+through it. A query for the statistics alone reads the results file and nothing else.
+
+With several partitions, their loads run concurrently on the shared pool while the fields are resolved; a field
+whose value is still loading waits for it, and identical loads within a request (same key) run only once.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from constants import llm_logs_path
+from my_graphql.utils.file_handler import load_partition_info, load_partition_data, load_evaluation_results, \
+    retrieve_log_info
+
+
+PREFETCH_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# Field names (as queried) grouped by the data they need
+PARTITION_INFO_FIELDS = {'totalCount', 'globalTotal', 'path', 'data', 'dataPageInfo'}
+EVALUATION_FIELDS = {'evaluationData', 'evaluationPageInfo', 'statistics', 'cerLlmGreaterCount', 'cerLlmLesserCount',
+                     'cerLlmEqualCount', 'runId', 'logs'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _prefetch_pool():
+    """Thread pool shared by all requests; its size bounds the loads running at the same time"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='prefetch')
+    return _pool
+
+
+class RequestMemo:
+    """Loaded values of one request, keyed by what they were loaded from"""
+
+    def __init__(self):
+        self.futures = dict()
+        self.lock = threading.Lock()
+
+    def get(self, key, load):
+        """
+        Return the value of `key`, calling `load()` the first time it is requested.
+        A key requested while it is being loaded (by another thread) waits for that load instead of repeating it.
+        """
+        with self.lock:
+            future = self.futures.get(key)
+            owner = future is None
+            if owner:
+                future = self.futures[key] = Future()
+
+        if owner:
+            # The loading thread runs `load` itself, so a waiter never depends on a queued task
+            try:
+                future.set_result(load())
+            except Exception as e:
+                future.set_exception(e)
+
+        return future.result()
+
+
+class PartitionSource:
+    """
+    One partition of a `partitionData` query.
+
+    :param memo: RequestMemo of the request.
+    :param comparison: CER comparison set listed by `evaluationData` ('greater', 'lesser', 'equal' or None for all).
+    """
+
+    def __init__(self, memo, partition, name_dataset, name_method, htr_model, llm_name, dict_name, number_of_rows,
+                 training_sizes, training_suggestion, comparison=None, max_log_lines=None):
+        self.memo = memo
+        self.partition = partition
+        self.name_dataset = name_dataset
+        self.name_method = name_method
+        self.htr_model = htr_model
+        self.llm_name = llm_name
+        self.dict_name = 'empty' if dict_name == 'noTraining' else dict_name
+        self.number_of_rows = number_of_rows
+        self.training_sizes = training_sizes
+        self.training_suggestion = training_suggestion
+        self.comparison = comparison
+        self.max_log_lines = max_log_lines
+
+    def partition_info(self):
+        """(global total, full image path, partition size) of the dataset file"""
+        return self.memo.get(('partition_info', self.name_dataset, self.partition),
+                             lambda: load_partition_info(self.name_dataset, self.partition))
+
+    def load_rows(self, start, end):
+        """Rows [start, end) of the partition, read as one HDF5 slice"""
+        return self.memo.get(('rows', self.name_dataset, self.partition, start, end),
+                             lambda: load_partition_data(self.name_dataset, self.partition, end - start, start))
+
+    def evaluation_results(self):
+        """Cached `EvaluationResults` of the latest results file of the partition"""
+        return self.memo.get(('evaluation', self.name_dataset, self.name_method, self.partition, self.htr_model,
+                              self.llm_name, self.dict_name),
+                             lambda: load_evaluation_results(self.name_dataset, self.name_method, self.partition,
+                                                             self.htr_model, self.llm_name, self.dict_name))
+
+    def evaluation_rows(self, comparison=None, **selection):
+        """
+        Evaluation rows listed by `evaluationData`: the query's comparison set unless `comparison` is given,
+        filtered, reduced and ordered by `selection` (see `EvaluationResults.select`)
+        """
+        comparison = comparison or self.comparison
+        results = self.evaluation_results()
+        if not any(selection.get(name) for name in ('ranges', 'file_name_prefix', 'top', 'order_by')):
+            return results.view(comparison)
+
+        # evaluationData and evaluationPageInfo with the same arguments share the selection
+        key = tuple(sorted((name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+                           for name, value in selection.items()))
+        return self.memo.get(('evaluation_rows', id(results), comparison, key),
+                             lambda: results.select(comparison, **selection))
+
+    def prefetch(self, fields):
+        """Load what `fields` (queried field names) need, in dependency order"""
+        if fields & PARTITION_INFO_FIELDS:
+            self.partition_info()
+        if fields & EVALUATION_FIELDS:
+            self.evaluation_results()
+        if 'logs' in fields:
+            self.logs()
+
+    def logs(self):
+        """Log block of the run that produced the results"""
+        log_file = os.path.join(llm_logs_path, f'workflow_{self.name_dataset}_{self.htr_model}_{self.llm_name}_'
+                                               f'{self.name_method}_{self.partition}_{self.dict_name}.log')
+        run_id = self.evaluation_results().run_id
+        return self.memo.get(('logs', log_file, run_id, self.max_log_lines),
+                             lambda: retrieve_log_info(log_file, run_id, self.max_log_lines))
+
+
+def prefetch(sources, fields):
+    """
+    Start loading the data of `fields` for every source on the shared pool, without waiting for it.
+    Errors are raised again by the fields that need the failed load.
+
+    :param sources: PartitionSource list of a request.
+    :param fields: Names of the queried PartitionData fields.
+    """
+    if len(sources) < 2:
+        return  # A single partition is loaded by its own field resolvers
+
+    pool = _prefetch_pool()
+    for source in sources:
+        pool.submit(_run_quietly, source.prefetch, fields)
+
+
+def _run_quietly(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        pass  # Kept by the RequestMemo future and reported by the field that needs it
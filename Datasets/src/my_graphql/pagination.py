@@ -0,0 +1,60 @@
+"""
+Cursor pagination helpers for the list fields of the GraphQL schema:
+    offset_to_cursor / cursor_to_offset: opaque cursors (base64 of the row offset, as in Relay array connections)
+    page_bounds: rows [start, end) selected by `first` and `after`
+    page_info: values of the PageInfo of a page
+"""
+
+import base64
+
+from graphql import GraphQLError
+
+CURSOR_PREFIX = "offset:"
+MAX_PAGE_SIZE = 1000
+
+
+def offset_to_cursor(offset):
+    """Opaque cursor of a row offset"""
+    return base64.b64encode(f"{CURSOR_PREFIX}{offset}".encode('utf-8')).decode('ascii')
+
+
+def cursor_to_offset(cursor):
+    """Row offset of a cursor"""
+    try:
+        value = base64.b64decode(cursor.encode('ascii')).decode('utf-8')
+        if not value.startswith(CURSOR_PREFIX):
+            raise ValueError(value)
+        return int(value[len(CURSOR_PREFIX):])
+    except ValueError:
+        raise GraphQLError(f"Invalid cursor: {cursor}")
+
+
+def page_bounds(total, first, after, default_first=None):
+    """
+    Rows of a page: the `first` rows after the `after` cursor (from the start without one).
+
+    :param total: Number of rows of the list.
+    :param first: Page size, at most MAX_PAGE_SIZE (None for `default_first`, or the rest of the list).
+    :param after: Cursor of the row preceding the page, or None.
+    :param default_first: Page size when `first` isn't given.
+    :return: (start, end) row offsets.
+    """
+    if first is None:
+        first = default_first if default_first is not None else total
+    elif not 0 <= first <= MAX_PAGE_SIZE:
+        raise GraphQLError(f"Argument 'first' must be between 0 and {MAX_PAGE_SIZE}.")
+
+    start = min(max(cursor_to_offset(after) + 1, 0), total) if after else 0
+    end = min(total, start + first)
+    return start, end
+
+
+def page_info(start, end, total):
+    """PageInfo values of the rows [start, end) of a list of `total` rows"""
+    return {
+        'start_cursor': offset_to_cursor(start) if end > start else None,
+        'end_cursor': offset_to_cursor(end - 1) if end > start else None,
+        'has_previous_page': start > 0,
+        'has_next_page': end < total,
+        'total_count': total
+    }
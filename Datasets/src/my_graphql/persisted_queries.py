@@ -0,0 +1,127 @@
+"""
+Execution of GraphQL requests with persisted queries and a parsed-document cache:
+    request_payload: the GraphQL payload of a Flask request, None for anything this module doesn't handle
+    execute_payload: run a payload against the schema, reusing the validated document of a known query
+
+Clients can send the SHA-256 of a query instead of its text (Apollo "automatic persisted queries": the
+`extensions.persistedQuery.sha256Hash` field). An unknown hash is answered with PersistedQueryNotFound, and the
+client sends it again with the query, which registers it. Every query, sent by hash or as text, is parsed and
+validated once; later requests with the same hash skip both steps.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from graphql import GraphQLError, execute, parse, validate
+
+CACHE_MAX_QUERIES = 1000
+
+_documents = OrderedDict()  # sha256 of the query -> validated DocumentNode
+_lock = threading.Lock()
+
+
+def _error(message, code=None):
+    error = {'message': message}
+    if code:
+        error['extensions'] = {'code': code}
+    return {'errors': [error]}
+
+
+def query_hash(query):
+    """SHA-256 of a query, as sent by persisted query clients"""
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+def request_payload(request):
+    """
+    Return the GraphQL payload (query, variables, operationName, extensions) of a Flask request.
+
+    :return: dict, or None for requests left to the GraphQL view (GraphiQL page, GET without persisted query).
+    """
+    if request.method == 'POST' and request.is_json:
+        payload = request.get_json(silent=True)
+        return payload if isinstance(payload, dict) else None
+
+    if request.method == 'GET' and 'extensions' in request.args:
+        # Persisted queries sent by GET (cacheable by proxies): JSON-encoded variables and extensions
+        try:
+            return {
+                'query': request.args.get('query'),
+                'variables': json.loads(request.args.get('variables') or 'null'),
+                'operationName': request.args.get('operationName'),
+                'extensions': json.loads(request.args['extensions'])
+            }
+        except ValueError:
+            return {'invalid': True}
+
+    return None
+
+
+def _document(schema, sha256, query):
+    """Validated document of a query (parsed at most once per hash), or (None, errors)"""
+    with _lock:
+        document = _documents.get(sha256)
+        if document is not None:
+            _documents.move_to_end(sha256)
+            return document, None
+
+    if query is None:
+        return None, _error('PersistedQueryNotFound', 'PERSISTED_QUERY_NOT_FOUND')
+
+    try:
+        document = parse(query)
+    except GraphQLError as e:
+        return None, {'errors': [e.formatted]}
+
+    errors = validate(schema.graphql_schema, document)
+    if errors:
+        return None, {'errors': [e.formatted for e in errors]}
+
+    with _lock:
+        _documents[sha256] = document
+        while len(_documents) > CACHE_MAX_QUERIES:
+            _documents.popitem(last=False)
+
+    return document, None
+
+
+def execute_payload(schema, payload, context=None):
+    """
+    Execute a GraphQL payload.
+
+    :param schema: graphene Schema.
+    :param payload: Result of `request_payload`.
+    :param context: Context value passed to the resolvers.
+    :return: (response body as a dict, HTTP status).
+    """
+    if payload.get('invalid'):
+        return _error('Invalid JSON in the request parameters.'), 400
+
+    query = payload.get('query')
+    persisted = (payload.get('extensions') or {}).get('persistedQuery')
+
+    if persisted:
+        sha256 = persisted.get('sha256Hash')
+        if not sha256:
+            return _error('Missing sha256Hash in the persisted query.'), 400
+        if query is not None and query_hash(query) != sha256:
+            return _error('provided sha does not match query', 'INTERNAL_SERVER_ERROR'), 400
+    elif query:
+        sha256 = query_hash(query)
+    else:
+        return _error('Must provide query string.'), 400
+
+    document, errors = _document(schema, sha256, query)
+    if document is None:
+        # An unknown persisted query is not a client error: the client retries with the full query
+        return errors, 200 if persisted and query is None else 400
+
+    result = execute(schema.graphql_schema, document, context_value=context,
+                     variable_values=payload.get('variables'), operation_name=payload.get('operationName'))
+
+    response = {'data': result.data}
+    if result.errors:
+        response['errors'] = [e.formatted for e in result.errors]
+    return response, 200
@@ -1,11 +1,7 @@
-import os.path
-
 import graphene
-import time
-from constants import llm_logs_path, llm_logs_file
-from my_graphql.utils.file_handler import load_partition_data, load_evaluation_results, calculate_cer_statistics, \
-    retrieve_log_info
-from my_graphql.types import PartitionData, Statistics
+from graphql.language import FieldNode
+from my_graphql.loaders import RequestMemo, PartitionSource, prefetch, PARTITION_INFO_FIELDS, EVALUATION_FIELDS
+from my_graphql.types import PartitionData
 
 
 # Define the Query class for fetching HDF5 data and evaluation results
@@ -21,84 +17,39 @@ class Query(graphene.ObjectType):
         training_sizes=graphene.List(graphene.String, default_value=['train_25', 'train_50', 'train_75', 'train_100']),
         training_suggestion=graphene.List(graphene.String,
                                           default_value=['bentham', 'iam', 'washington', 'whitefield', 'empty']),
-        llm_name=graphene.String(required=True)
+        llm_name=graphene.String(required=True),
+        max_log_lines=graphene.Int()  # Cap on the number of log lines returned (all lines of the run by default)
     )
 
     def resolve_partition_data(self, info, partition, name_dataset, name_method, number_of_rows, training_sizes,
-                               training_suggestion, llm_name, htr_model, dict_name):
-        partition_results = []
-
-        for part in partition:
-            time.sleep(0.09)
-            partition_data, partition_global_total, partition_full_path, total_count = load_partition_data(
-                name_dataset, part, number_of_rows
-            )
-            eval_results = load_evaluation_results(name_dataset, name_method, part, htr_model, llm_name, dict_name)
-
-            # Log evaluation results to check if CER values are available
-            # print(f"Evaluation results for {name_dataset}, partition {part}: {eval_results}")
-
-            # Calculate CER statistics for the current partition
-            cer_statistics = calculate_cer_statistics(eval_results)
-
-            # Automatically calculate counts for different CER conditions
-            run_id = eval_results[0].run_id
-
-            if dict_name == 'noTraining':
-                dict_name = 'empty'
-            log_file = os.path.join(llm_logs_path,
-                                    f'workflow_{name_dataset}_{htr_model}_{llm_name}_{name_method}_{part}_{dict_name}.log')
-            logs = retrieve_log_info(log_file, run_id)
-            # logs = retrieve_log_info(llm_logs_file, run_id)
-
-            print(logs)
-            cer_llm_greater_count = sum(1 for result in eval_results if result.cer_llm > result.cer_ocr)
-            cer_llm_lesser_count = sum(1 for result in eval_results if result.cer_llm < result.cer_ocr)
-            cer_llm_equal_count = sum(1 for result in eval_results if result.cer_llm == result.cer_ocr)
-
-            # Create a function to filter evaluation results based on the requested condition
-            def get_filtered_results(condition):
-                if condition == 'greater':
-                    return [result for result in eval_results if result.cer_llm > result.cer_ocr]
-                elif condition == 'lesser':
-                    return [result for result in eval_results if result.cer_llm < result.cer_ocr]
-                elif condition == 'equal':
-                    return [result for result in eval_results if result.cer_llm == result.cer_ocr]
-                return eval_results
-
-            # Check what field is being queried and return the corresponding evaluation data
-            queried_fields = {field.name.value for field in info.field_nodes[0].selection_set.selections}
-
-            if 'cerLlmGreaterCount' in queried_fields:
-                filtered_eval_results = get_filtered_results('greater')
-            elif 'cerLlmLesserCount' in queried_fields:
-                filtered_eval_results = get_filtered_results('lesser')
-            elif 'cerLlmEqualCount' in queried_fields:
-                filtered_eval_results = get_filtered_results('equal')
-            else:
-                filtered_eval_results = eval_results
-
-            # Return the full result including counts
-            partition_results.append(
-                PartitionData(
-                    total_count=total_count,
-                    global_total=partition_global_total,
-                    path=partition_full_path,
-                    data=partition_data,
-                    evaluation_data=filtered_eval_results,
-                    statistics=cer_statistics,
-                    training_sizes=training_sizes,
-                    training_suggestion=training_suggestion,
-                    llm_name=llm_name,
-                    cer_llm_greater_count=cer_llm_greater_count,
-                    cer_llm_lesser_count=cer_llm_lesser_count,
-                    cer_llm_equal_count=cer_llm_equal_count,
-                    run_id=run_id,
-                    logs=logs,
-                )
-            )
-
-        return partition_results
+                               training_suggestion, llm_name, htr_model, dict_name, max_log_lines=None):
+        # Check what field is being queried to select the evaluation data (all rows by default)
+        selections = info.field_nodes[0].selection_set.selections
+        queried_fields = {field.name.value for field in selections if isinstance(field, FieldNode)}
+
+        if 'cerLlmGreaterCount' in queried_fields:
+            comparison = 'greater'
+        elif 'cerLlmLesserCount' in queried_fields:
+            comparison = 'lesser'
+        elif 'cerLlmEqualCount' in queried_fields:
+            comparison = 'equal'
+        else:
+            comparison = None
+
+        # Nothing is loaded here: each PartitionData field loads what it needs, once per request.
+        # The partitions' loads are started concurrently so they overlap while the fields are resolved.
+        memo = RequestMemo()
+        sources = [
+            PartitionSource(memo, part, name_dataset, name_method, htr_model, llm_name, dict_name, number_of_rows,
+                            training_sizes, training_suggestion, comparison, max_log_lines)
+            for part in partition
+        ]
+        if all(isinstance(field, FieldNode) for field in selections):
+            prefetch(sources, queried_fields)
+        else:
+            # Fragments: prefetch everything the fields could need
+            prefetch(sources, queried_fields | PARTITION_INFO_FIELDS | EVALUATION_FIELDS)
+        return sources
 
 
 # Define the schema
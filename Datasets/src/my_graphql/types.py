@@ -1,4 +1,7 @@
 import graphene
+from graphql import GraphQLError
+
+from my_graphql.pagination import MAX_PAGE_SIZE, page_bounds, page_info
 
 
 # Update FileInfo to include LLM-related fields like confidence and justification
@@ -14,7 +17,7 @@ class FileInfo(graphene.ObjectType):
     wer_ocr = graphene.Float()
     wer_llm = graphene.Float()
     run_id = graphene.String()
-    image_data = graphene.List(graphene.Float)  # Image data as floats
+    image_url = graphene.String()  # URL of the line image (PNG), served by the /images route
 
 
 # Define a new Statistics type to hold CER aggregation data
@@ -32,13 +35,107 @@ class Statistics(graphene.ObjectType):
     average_confidence = graphene.Float()
 
 
+# Position of a page in a paginated list (`first`/`after` arguments)
+class PageInfo(graphene.ObjectType):
+    start_cursor = graphene.String()  # Cursor of the first row of the page
+    end_cursor = graphene.String()  # Cursor of the last row, to pass as `after` for the next page
+    has_previous_page = graphene.Boolean()
+    has_next_page = graphene.Boolean()
+    total_count = graphene.Int()  # Rows in the whole list
+
+
+# Metrics of the evaluation rows that can be filtered on and sorted by (CER delta = LLM CER - OCR CER)
+class EvaluationMetric(graphene.Enum):
+    CER_OCR = 'cer_ocr'
+    CER_LLM = 'cer_llm'
+    WER_OCR = 'wer_ocr'
+    WER_LLM = 'wer_llm'
+    CER_DELTA = 'cer_delta'
+    CONFIDENCE = 'confidence'
+    FILE_NAME = 'file_name'
+
+
+# Rows where the LLM CER is greater than, less than or equal to the OCR CER
+class CerComparison(graphene.Enum):
+    GREATER = 'greater'
+    LESSER = 'lesser'
+    EQUAL = 'equal'
+
+
+# Lines whose CER the LLM correction reduced (most improved) or increased (most degraded) the most
+class TopLines(graphene.Enum):
+    MOST_IMPROVED = 'most_improved'
+    MOST_DEGRADED = 'most_degraded'
+
+
+# Inclusive bounds, either of which can be left open
+class FloatRange(graphene.InputObjectType):
+    min = graphene.Float()
+    max = graphene.Float()
+
+
+# Conditions on the evaluation rows, all of which must hold
+class EvaluationFilter(graphene.InputObjectType):
+    cer_ocr = graphene.InputField(FloatRange)
+    cer_llm = graphene.InputField(FloatRange)
+    wer_ocr = graphene.InputField(FloatRange)
+    wer_llm = graphene.InputField(FloatRange)
+    cer_delta = graphene.InputField(FloatRange)
+    confidence = graphene.InputField(FloatRange)
+    file_name_prefix = graphene.String()
+    comparison = graphene.InputField(CerComparison)  # Overrides the set picked from the cerLlm*Count fields
+
+
+def evaluation_arguments():
+    """Arguments of the evaluation list fields: filter, then top-k lines, then order, then the page"""
+    return dict(
+        first=graphene.Int(),
+        after=graphene.String(),
+        filter=graphene.Argument(EvaluationFilter),
+        top=graphene.Argument(TopLines),
+        top_k=graphene.Int(default_value=10),
+        order_by=graphene.Argument(EvaluationMetric),
+        descending=graphene.Boolean(default_value=False)
+    )
+
+
+def _enum_value(value):
+    return getattr(value, 'value', value)
+
+
+def evaluation_selection(filter=None, top=None, top_k=10, order_by=None, descending=False):
+    """Keyword arguments of `EvaluationResults.select` for the evaluation arguments of a query"""
+    if top is not None and not 0 < top_k <= MAX_PAGE_SIZE:
+        raise GraphQLError(f"Argument 'topK' must be between 1 and {MAX_PAGE_SIZE}.")
+
+    ranges = dict()
+    for metric in ('cer_ocr', 'cer_llm', 'wer_ocr', 'wer_llm', 'cer_delta', 'confidence'):
+        bounds = getattr(filter, metric, None) if filter else None
+        if bounds is not None and (bounds.min is not None or bounds.max is not None):
+            ranges[metric] = (bounds.min, bounds.max)
+
+    return dict(
+        comparison=_enum_value(filter.comparison) if filter and filter.comparison is not None else None,
+        ranges=ranges,
+        file_name_prefix=filter.file_name_prefix if filter else None,
+        top=_enum_value(top),
+        top_k=top_k,
+        order_by=_enum_value(order_by),
+        descending=descending
+    )
+
+
 # Add new fields to PartitionData to include LLM and training metadata
+# Instances are resolved from a `PartitionSource` (my_graphql.loaders): every field loads only the data it needs,
+# and the list fields are sliced according to `first` and `after`
 class PartitionData(graphene.ObjectType):
     total_count = graphene.Int()
     global_total = graphene.Int()
-    data = graphene.List(FileInfo)  # Actual partition data
+    data = graphene.List(FileInfo, first=graphene.Int(), after=graphene.String())  # Actual partition data
+    data_page_info = graphene.Field(PageInfo, first=graphene.Int(), after=graphene.String())
     path = graphene.String()
-    evaluation_data = graphene.List(FileInfo)  # Evaluation results
+    evaluation_data = graphene.List(FileInfo, **evaluation_arguments())  # Evaluation results
+    evaluation_page_info = graphene.Field(PageInfo, **evaluation_arguments())
     statistics = graphene.Field(Statistics)  # Add the statistics field
     training_sizes = graphene.List(graphene.String)  # List of training sizes (train_25, train_50, etc.)
     training_suggestion = graphene.List(graphene.String)  # List of training suggestions
@@ -48,3 +145,52 @@ class PartitionData(graphene.ObjectType):
     cer_llm_equal_count = graphene.Int()  # New field for count of LLM CER equal to OCR CER
     run_id = graphene.String()
     logs = graphene.String()
+
+    # Dataset file: partition counts and attributes only, the image datasets are never read here
+    def resolve_total_count(parent, info):
+        return parent.partition_info()[2]
+
+    def resolve_global_total(parent, info):
+        return parent.partition_info()[0]
+
+    def resolve_path(parent, info):
+        return parent.partition_info()[1]
+
+    def resolve_data(parent, info, first=None, after=None):
+        # Without `first`, a page holds the query's `number_of_rows`
+        total = parent.partition_info()[2]
+        start, end = page_bounds(total, first, after, parent.number_of_rows)
+        return parent.load_rows(start, end)
+
+    def resolve_data_page_info(parent, info, first=None, after=None):
+        total = parent.partition_info()[2]
+        return page_info(*page_bounds(total, first, after, parent.number_of_rows), total)
+
+    # Results file: rows, statistics and CER comparison sets are precomputed when it is loaded
+    def resolve_evaluation_data(parent, info, first=None, after=None, **selection):
+        rows = parent.evaluation_rows(**evaluation_selection(**selection))
+        start, end = page_bounds(len(rows), first, after)
+        return rows[start:end]
+
+    def resolve_evaluation_page_info(parent, info, first=None, after=None, **selection):
+        total = len(parent.evaluation_rows(**evaluation_selection(**selection)))
+        return page_info(*page_bounds(total, first, after), total)
+
+    def resolve_statistics(parent, info):
+        return parent.evaluation_results().statistics
+
+    def resolve_cer_llm_greater_count(parent, info):
+        return parent.evaluation_results().count('greater')
+
+    def resolve_cer_llm_lesser_count(parent, info):
+        return parent.evaluation_results().count('lesser')
+
+    def resolve_cer_llm_equal_count(parent, info):
+        return parent.evaluation_results().count('equal')
+
+    def resolve_run_id(parent, info):
+        return parent.evaluation_results().run_id
+
+    # Log file: only read when the logs are queried
+    def resolve_logs(parent, info):
+        return parent.logs()
@@ -1,11 +1,13 @@
 import os
-import json
 import logging
-import re
 
-from h5py import File
 from constants import splits_bentham_path, splits_washington_path, splits_iam_path, llm_outputs_path
 from my_graphql.types import FileInfo
+from my_graphql.utils.hdf5_cache import get_dataset_file
+from my_graphql.utils.line_images import file_version, image_url
+from my_graphql.utils.log_index import read_run_block
+from my_graphql.utils.results_catalog import get_catalog
+from my_graphql.utils.results_cache import EvaluationResults, get_evaluation_results
 
 # Define your paths here
 DATASET_PATHS = {
@@ -15,46 +17,64 @@ DATASET_PATHS = {
 }
 
 
-def load_partition_data(name_dataset, partition, number_of_rows):
-    """Load partition data from HDF5 file."""
-    hdf5_path = os.path.join(DATASET_PATHS.get(name_dataset), f'{name_dataset}_dataset.hdf5')
+def dataset_hdf5_path(name_dataset):
+    """Path of the HDF5 file of a dataset."""
+    return os.path.join(DATASET_PATHS.get(name_dataset), f'{name_dataset}_dataset.hdf5')
+
+
+def _open_partition(name_dataset, partition):
+    """Cached read-only handle of a dataset file, checking that the partition exists."""
+    hdf5_path = dataset_hdf5_path(name_dataset)
 
     if not os.path.exists(hdf5_path):
         raise FileNotFoundError(f"The dataset file {hdf5_path} does not exist.")
 
-    with File(hdf5_path, "r") as f:
-        if partition not in f:
-            raise ValueError(f"Partition '{partition}' not found in the dataset.")
+    # Cached read-only handle; counts, global total and attributes are computed once per file version
+    dataset_file = get_dataset_file(hdf5_path)
+
+    if partition not in dataset_file.counts:
+        raise ValueError(f"Partition '{partition}' not found in the dataset.")
+
+    return dataset_file
 
-        # Global total across all partitions
-        global_total = sum(len(f[f"{pt}/dt"]) for pt in ['train_100', 'train_75', 'train_50', 'train_25', 'valid', 'test'])
 
-        total_count = len(f[f"{partition}/dt"])
-        full_path = f.attrs['full_image_path']
+def load_partition_info(name_dataset, partition):
+    """Return the global total across all partitions, the full image path and the partition size."""
+    dataset_file = _open_partition(name_dataset, partition)
+    return dataset_file.global_total, dataset_file.attrs['full_image_path'], dataset_file.counts[partition]
 
-        # Load partition data
-        dt_data = f[f"{partition}/dt"][:number_of_rows]
-        gt_data = f[f"{partition}/gt"][:number_of_rows]
-        path_data = f[f"{partition}/path"][:number_of_rows]
 
-        # Decode byte strings
-        decoded_path_data = [path.decode('utf-8') for path in path_data]
-        decoded_gt_data = [gt.decode('utf-8') for gt in gt_data]
+def load_partition_data(name_dataset, partition, number_of_rows, offset=0):
+    """
+    Load `number_of_rows` rows of a partition starting at `offset` from the HDF5 file
+    (images are referenced by URL, served by the /images route).
+    """
+    dataset_file = _open_partition(name_dataset, partition)
+    f = dataset_file.handle
 
-        partition_data = [
-            FileInfo(
-                file_name=path,
-                ground_truth=gt,
-                image_data=list(dt.flatten())
-            )
-            for dt, gt, path in zip(dt_data, decoded_gt_data, decoded_path_data)
-        ]
+    # Load partition data (only the requested slice is read)
+    gt_data = f[f"{partition}/gt"][offset:offset + number_of_rows]
+    path_data = f[f"{partition}/path"][offset:offset + number_of_rows]
+
+    # Decode byte strings
+    decoded_path_data = [path.decode('utf-8') for path in path_data]
+    decoded_gt_data = [gt.decode('utf-8') for gt in gt_data]
+
+    version = file_version(dataset_file)
+    partition_data = [
+        FileInfo(
+            file_name=path,
+            ground_truth=gt,
+            image_url=image_url(name_dataset, partition, index, version)
+        )
+        for index, (gt, path) in enumerate(zip(decoded_gt_data, decoded_path_data), start=offset)
+    ]
 
-    return partition_data, global_total, full_path, total_count
+    return partition_data
 
 
 def load_evaluation_results(name_dataset, name_method, partition, htr_model, llm_name, dict_name):
-    """Load the most recent evaluation results from a JSON file."""
+    """Load the most recent evaluation results (cached `EvaluationResults`, empty if there are none)."""
     eval_dir_path = os.path.join(llm_outputs_path, name_dataset, htr_model, llm_name, name_method, partition)
 
     if dict_name == 'noTraining':
@@ -63,137 +83,24 @@ def load_evaluation_results(name_dataset, name_method, partition, htr_model, llm
 
     if not os.path.exists(eval_dir_path):
         logging.warning(f"Evaluation directory not found for {name_dataset} - {name_method} - {partition}. Path: {eval_dir_path}")
-        return []
+        return EvaluationResults([])
 
-    # Find all files that match the 'results_*.json' pattern
-    result_files = [f for f in os.listdir(eval_dir_path) if f.startswith(f'results_{dict_name}_') and f.endswith('.json')]
+    # The most recent 'results_{dict_name}_*.json' file comes from the catalog of the results directory
+    eval_file_path = get_catalog(llm_outputs_path).latest(name_dataset, htr_model, llm_name, name_method, partition,
+                                                          dictionary=dict_name)
 
-    if not result_files:
+    if eval_file_path is None:
         logging.warning(f"No results found for {name_dataset} - {partition} - dictionary: {dict_name}. Path: {eval_dir_path}")
-        return []
-
-    logging.info(f"Result files found: {len(result_files)}")
-
-    # Sort the result files by the timestamp in the filename (most recent first)
-    result_files.sort(reverse=True)
-
-    # Load the most recent results file
-    most_recent_file = result_files[0]
-    eval_file_path = os.path.join(eval_dir_path, most_recent_file)
-
-    with open(eval_file_path, 'r') as eval_file:
-        eval_data = json.load(eval_file)
-
-    logging.info(f"Loading evaluation file: {eval_file_path}")
-    logging.info(f"File contents: {eval_data}")
-    run_id = eval_data[0].get("run_id")
-
-    def parse_confidence(confidence_str):
-        """Helper function to parse the confidence score and handle non-integer values."""
-        try:
-            # Try to convert confidence value to an integer
-            return int(confidence_str)
-        except (ValueError, TypeError):
-            # Return 0 if conversion fails
-            return 0
-
+        return EvaluationResults([])
 
-    evaluation_data = [
-        FileInfo(
-            file_name=item['file_name'],
-            ground_truth=item['ground_truth_label'],
-            predicted_text_ocr=item['OCR']['predicted_label'],
-            cer_ocr=item['OCR']['cer'],
-            predicted_text_llm=item['Prompt correcting']['predicted_label'],
-            cer_llm=item['Prompt correcting']['cer'],
-            confidence=parse_confidence(item['Prompt correcting'].get('confidence', 0)),
-            justification=item['Prompt correcting']['justification'],
-            wer_ocr=item['OCR']['wer'],
-            wer_llm=item['Prompt correcting']['wer'],
-            run_id=run_id,
-            image_data=None
-        )
-        for item in eval_data
-    ]
-
-    return evaluation_data
-
-
-def calculate_cer_statistics(evaluation_data):
-    """Calculate average, minimum, and maximum CER for both OCR and LLM correction."""
-    if not evaluation_data:
-        return None  # No data to calculate
-
-    # Collect valid CER and WER values for both OCR and LLM
-    cer_ocr_values = [result.cer_ocr for result in evaluation_data if result.cer_ocr is not None]
-    cer_llm_values = [result.cer_llm for result in evaluation_data if result.cer_llm is not None]
-    wer_ocr_values = [result.wer_ocr for result in evaluation_data if result.wer_ocr is not None]
-    wer_llm_values = [result.wer_llm for result in evaluation_data if result.wer_llm is not None]
-    confidence_values = [result.confidence for result in evaluation_data if result.confidence is not None]
-
-    # Calculate sum of all CER and WER values
-    total_cer_ocr = sum(cer_ocr_values) if cer_ocr_values else 0
-    total_cer_llm = sum(cer_llm_values) if cer_llm_values else 0
-    total_wer_ocr = sum(wer_ocr_values) if wer_ocr_values else 0
-    total_wer_llm = sum(wer_llm_values) if wer_llm_values else 0
-    total_confidence = sum(confidence_values) if confidence_values else 0
+    # Parsed once per version of the file on disk
+    return get_evaluation_results(eval_file_path)
 
-    # Calculate CER and WER reduction percentages only if there are valid values
-    cer_reduction_percentage = ((total_cer_ocr - total_cer_llm) / total_cer_ocr * 100) if total_cer_ocr > 0 else None
-    wer_reduction_percentage = ((total_wer_ocr - total_wer_llm) / total_wer_ocr * 100) if total_wer_ocr > 0 else None
-
-    # Return the calculated statistics
-    return {
-
-        'min_cer_ocr': round(min(cer_ocr_values), 3) if cer_ocr_values else None,
-        'max_cer_ocr': round(max(cer_ocr_values), 3) if cer_ocr_values else None,
-        'min_cer_llm': round(min(cer_llm_values), 3) if cer_llm_values else None,
-        'max_cer_llm': round(max(cer_llm_values), 3) if cer_llm_values else None,
-        'average_cer_llm': round(total_cer_llm / len(cer_llm_values), 3) if cer_llm_values else None,
-        'average_wer_llm': round(total_wer_llm / len(wer_llm_values), 3) if wer_llm_values else None,
-        'average_cer_ocr': round(total_cer_ocr / len(cer_ocr_values), 3) if cer_ocr_values else None,
-        'average_wer_ocr': round(total_wer_ocr / len(wer_ocr_values), 3) if wer_ocr_values else None,
-        'average_confidence': round(total_confidence / len(confidence_values), 3) if confidence_values else None,
-        'cer_reduction_percentage': round(cer_reduction_percentage, 3) if cer_reduction_percentage is not None else None,
-        'wer_reduction_percentage': round(wer_reduction_percentage, 3) if wer_reduction_percentage is not None else None
-    }
-
-
-
-def retrieve_log_info(log_file, run_id):
-    log_entries = []
-    capture = False  # Flag to start capturing logs
 
+def retrieve_log_info(log_file, run_id, max_lines=None):
+    """Return the log block of one run (at most `max_lines` lines), read through the offset index of the log."""
     if not os.path.exists(log_file):
         return f"Log file '{log_file}' not found."
 
-    # Regex patterns to detect the start and end of log blocks
-    run_start_pattern = re.compile(
-        rf"=== Running for '(?P<dataset>.+?)' with '(?P<train_size>.+?)' and suggestion dictionary '(?P<dict_suggestion>.+?)' "
-        rf"\| (?P<method_name>.+?) \| Run ID: {run_id} ==="
-    )
-    run_complete_pattern = re.compile(
-        rf"=== Evaluation for '(?P<dataset>.+?)' with '(?P<train_size>.+?)' and suggestion dictionary '(?P<dict_suggestion>.+?)' "
-        rf"completed and results saved \| (?P<method_name>.+?) \| Run ID: {run_id} ==="
-    )
-
-    # Read the log file
-    with open(log_file, 'r') as file:
-        for line in file:
-            # Check if we found the start of the run_id block
-            if run_start_pattern.search(line):
-                capture = True  # Start capturing logs for the specified run_id
-                log_entries.append(line.strip())  # Include the start line
-
-            # Capture all subsequent lines related to that run_id
-            if capture:
-                log_entries.append(line.strip())
-
-            # If we find the completion log entry for the same run_id, stop capturing
-            if run_complete_pattern.search(line) and capture:
-                break  # Stop capturing after the complete line is found
-
     # Join all log entries into a single string to return
-    return "\n".join(log_entries)
-
-
+    return "\n".join(read_run_block(log_file, run_id, max_lines))
@@ -0,0 +1,63 @@
+"""
+Process-wide cache of read-only dataset HDF5 handles and their metadata for the GraphQL server:
+    get_dataset_file: open (or reuse) a dataset file with its partition counts, global total and attributes
+
+Entries are keyed by path and replaced when the file's mtime, size or inode change (a rebuild moves a new
+file over the old one). A replaced handle is not closed explicitly: requests still reading it keep a
+consistent view of the old file, and h5py closes it once the last reference is gone.
+"""
+
+import os
+import logging
+import threading
+
+import h5py
+
+try:
+    import hdf5plugin  # noqa: F401  Registers the optional blosc/zstd filters used by some dataset builds
+except ImportError:
+    hdf5plugin = None
+
+PARTITIONS = ['train_100', 'train_75', 'train_50', 'train_25', 'valid', 'test']
+
+_cache = dict()
+_lock = threading.Lock()
+
+
+class DatasetFile:
+    """Open read-only dataset file with the metadata every query needs"""
+
+    def __init__(self, path, stamp):
+        self.path = path
+        self.stamp = stamp
+        self.handle = h5py.File(path, "r")
+
+        # Line count of every partition present, and the global total across all of them
+        self.counts = {pt: len(self.handle[f"{pt}/dt"]) for pt in PARTITIONS if pt in self.handle}
+        self.global_total = sum(self.counts.values())
+        self.attrs = dict(self.handle.attrs)
+
+
+def _stamp(path):
+    """Identity of the file content on disk"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def get_dataset_file(path):
+    """
+    Return the cached `DatasetFile` of an HDF5 file, reopening it if the file changed on disk.
+
+    :param path: Path to the dataset HDF5 file.
+    :return: DatasetFile.
+    """
+    stamp = _stamp(path)
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry is None or entry.stamp != stamp:
+            logging.info(f"Opening dataset file {path}")
+            entry = DatasetFile(path, stamp)
+            _cache[path] = entry
+
+    return entry
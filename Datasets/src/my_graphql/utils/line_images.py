@@ -0,0 +1,86 @@
+"""
+Line images served as encoded bytes by the `/images` route of the Flask app:
+    image_url: URL of one line image, used by the GraphQL results instead of the raw pixel values
+    get_line_image: encode one preprocessed line of a dataset file (PNG or WebP), with its ETag
+
+Encoded images are kept in a bounded in-memory LRU keyed by (file version, partition, index, format).
+The file version is part of the URL, so a given URL always maps to the same bytes and can be cached
+by browsers as immutable; a rebuilt dataset gets new URLs.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+from flask import has_request_context, request
+
+from my_graphql.utils.hdf5_cache import get_dataset_file
+
+IMAGE_FORMATS = {'png': ('.png', 'image/png'), 'webp': ('.webp', 'image/webp')}
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_lock = threading.Lock()
+
+
+def file_version(dataset_file):
+    """Short identifier of the version of a dataset file on disk"""
+    return hashlib.sha1(repr(dataset_file.stamp).encode('utf-8')).hexdigest()[:12]
+
+
+def image_url(name_dataset, partition, index, version, image_format='png'):
+    """
+    URL of a line image, absolute when called while serving a request.
+
+    :param version: `file_version` of the dataset file the index refers to.
+    """
+    base = request.host_url.rstrip('/') if has_request_context() else ''
+    return f"{base}/images/{name_dataset}/{partition}/{index}.{image_format}?v={version}"
+
+
+def get_line_image(hdf5_path, partition, index, image_format):
+    """
+    Return the encoded image of one line with its strong ETag.
+
+    :param hdf5_path: Path to the dataset HDF5 file.
+    :param partition: Partition of the line.
+    :param index: Row of the line in the partition.
+    :param image_format: 'png' or 'webp'.
+    :return: (bytes, etag, version), or None if the partition or index doesn't exist.
+    """
+    global _cache_bytes
+
+    dataset_file = get_dataset_file(hdf5_path)
+    if partition not in dataset_file.counts or not 0 <= index < dataset_file.counts[partition]:
+        return None
+
+    version = file_version(dataset_file)
+    key = (hdf5_path, version, partition, index, image_format)
+
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key] + (version,)
+
+    # Rows are stored transposed (width, height); transpose back to display the line
+    line = dataset_file.handle[f"{partition}/dt"][index].T
+    extension, _ = IMAGE_FORMATS[image_format]
+    ok, encoded = cv2.imencode(extension, line)
+    if not ok:
+        raise ValueError(f"Could not encode line {index} of '{partition}' as {image_format}.")
+
+    data = encoded.tobytes()
+    etag = hashlib.sha1(data).hexdigest()
+
+    with _lock:
+        if key not in _cache:
+            _cache[key] = (data, etag)
+            _cache_bytes += len(data)
+
+            while _cache_bytes > CACHE_MAX_BYTES and len(_cache) > 1:
+                _, (evicted, _) = _cache.popitem(last=False)
+                _cache_bytes -= len(evicted)
+
+    return data, etag, version
@@ -0,0 +1,172 @@
+"""
+Byte-offset index of the runs logged in the LLM workflow log files:
+    index_path: location of the sidecar index of a log file (e.g., workflow_....log.index.json)
+    LogIndex: `run_id -> (start, end)` offsets of every run block, extended by reading only the new bytes
+    read_run_block: the log lines of one run, read with a single seek
+
+A run block goes from its "=== Running for ..." line to the matching "=== Evaluation for ... completed ..." line.
+The index is persisted next to the log file so a restarted server doesn't rescan the whole log; a log that
+was truncated or replaced is indexed again from the start. Runs still in progress have no end offset yet and
+read up to the last indexed line.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+
+INDEX_VERSION = 1
+CHUNK_SIZE = 8 * 1024 * 1024
+
+RUN_START_PATTERN = re.compile(
+    r"=== Running for '(?P<dataset>.+?)' with '(?P<train_size>.+?)' and suggestion dictionary '(?P<dict_suggestion>.+?)' "
+    r"\| (?P<method_name>.+?) \| Run ID: (?P<run_id>\S+) ==="
+)
+RUN_COMPLETE_PATTERN = re.compile(
+    r"=== Evaluation for '(?P<dataset>.+?)' with '(?P<train_size>.+?)' and suggestion dictionary '(?P<dict_suggestion>.+?)' "
+    r"completed and results saved \| (?P<method_name>.+?) \| Run ID: (?P<run_id>\S+) ==="
+)
+
+_indexes = dict()
+_lock = threading.Lock()
+
+
+def index_path(log_file):
+    """Return the sidecar index path of a log file"""
+
+    return f"{log_file}.index.json"
+
+
+class LogIndex:
+    """Offsets of the run blocks of one log file, up to `offset` (always the end of a complete line)"""
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.inode = None
+        self.offset = 0
+        self.runs = dict()
+        self.lock = threading.Lock()
+        self._load()
+
+    def _reset(self, inode):
+        self.inode = inode
+        self.offset = 0
+        self.runs = dict()
+
+    def _load(self):
+        """Load the persisted index, if any"""
+        try:
+            with open(index_path(self.log_file), 'r') as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') == INDEX_VERSION:
+            self.inode = data['inode']
+            self.offset = data['offset']
+            self.runs = {run_id: tuple(span) for run_id, span in data['runs'].items()}
+
+    def _save(self):
+        """Persist the index (atomically); an unwritable log directory only disables persistence"""
+        path = index_path(self.log_file)
+        data = {'version': INDEX_VERSION, 'inode': self.inode, 'offset': self.offset,
+                'runs': {run_id: list(span) for run_id, span in self.runs.items()}}
+        # Per-process temporary file: server workers may index the same log at the same time
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'w') as index_file:
+                json.dump(data, index_file)
+            os.replace(temporary, path)
+        except OSError as e:
+            logging.warning(f"Could not save the log index {path}: {e}")
+
+    def _scan(self, data, position):
+        """Record the run boundaries found in `data` (complete lines starting at byte `position`)"""
+        for line in data.splitlines(keepends=True):
+            # Only the run marker lines can match; skip decoding and matching everything else
+            if b"=== " in line:
+                text = line.decode('utf-8', errors='replace')
+
+                match = RUN_START_PATTERN.search(text)
+                if match and match['run_id'] not in self.runs:
+                    self.runs[match['run_id']] = (position, None)
+
+                match = RUN_COMPLETE_PATTERN.search(text)
+                if match and match['run_id'] in self.runs:
+                    start, end = self.runs[match['run_id']]
+                    if end is None:
+                        self.runs[match['run_id']] = (start, position + len(line))
+
+            position += len(line)
+
+    def update(self):
+        """Index the bytes appended since the last update"""
+        with self.lock:
+            stat = os.stat(self.log_file)
+            if stat.st_ino != self.inode or stat.st_size < self.offset:
+                self._reset(stat.st_ino)
+
+            if stat.st_size == self.offset:
+                return
+
+            with open(self.log_file, 'rb') as log:
+                log.seek(self.offset)
+                remaining = stat.st_size - self.offset
+                pending = b""
+
+                while remaining > 0:
+                    chunk = log.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+
+                    # A partially written last line is carried over, and indexed once it is complete
+                    data = pending + chunk
+                    complete = data.rfind(b"\n") + 1
+                    self._scan(data[:complete], self.offset)
+                    self.offset += complete
+                    pending = data[complete:]
+
+            self._save()
+
+    def span(self, run_id):
+        """(start, end) offsets of a run block, None if the run isn't in the log"""
+        with self.lock:
+            if run_id not in self.runs:
+                return None
+            start, end = self.runs[run_id]
+            return start, end if end is not None else self.offset
+
+
+def get_log_index(log_file):
+    """Return the shared, up to date `LogIndex` of a log file"""
+    with _lock:
+        index = _indexes.get(log_file)
+        if index is None:
+            index = _indexes[log_file] = LogIndex(log_file)
+
+    index.update()
+    return index
+
+
+def read_run_block(log_file, run_id, max_lines=None):
+    """
+    Return the log lines of one run, from its start line to its completion line.
+
+    :param log_file: Path to the workflow log file.
+    :param run_id: Run ID written in the start and completion lines.
+    :param max_lines: Maximum number of lines to return (None for the whole block).
+    :return: List of stripped lines (empty if the run isn't in the log).
+    """
+    span = get_log_index(log_file).span(run_id)
+    if span is None:
+        return []
+
+    start, end = span
+    with open(log_file, 'rb') as log:
+        log.seek(start)
+        data = log.read(end - start)
+
+    lines = [line.strip() for line in data.decode('utf-8', errors='replace').splitlines()]
+    return lines[:max_lines] if max_lines is not None else lines
@@ -0,0 +1,227 @@
+"""
+Process-wide cache of parsed evaluation results for the GraphQL server:
+    EvaluationResults: one results file as FileInfo rows, NumPy metric columns, statistics and CER comparison sets
+    RowView: rows of a comparison set or selection, sliced lazily by the paginated resolvers
+    get_evaluation_results: parse (or reuse) a results file
+
+Entries live in a bounded LRU keyed by (path, mtime); a rewritten file is parsed again on its next query.
+Everything that depends on the whole file is computed once at load, so a repeated query only pays
+for the rows of the page it returns.
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from my_graphql.types import FileInfo
+
+CACHE_MAX_ENTRIES = 256
+COMPARISONS = ('greater', 'lesser', 'equal')
+METRICS = ('cer_ocr', 'cer_llm', 'wer_ocr', 'wer_llm', 'cer_delta', 'confidence')
+TOP_LINES = ('most_improved', 'most_degraded')
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def parse_confidence(confidence_str):
+    """Parse the confidence score, 0 for non-integer values."""
+    try:
+        return int(confidence_str)
+    except (ValueError, TypeError):
+        return 0
+
+
+def _column(values):
+    """Float column of a metric, NaN where the value is missing"""
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def _round(value):
+    return round(float(value), 3)
+
+
+def _statistics(cer_ocr, cer_llm, wer_ocr, wer_llm, confidence):
+    """Average, minimum and maximum CER/WER of OCR and LLM correction, and their reduction percentages."""
+    if not len(cer_ocr):
+        return None  # No data to calculate
+
+    # Only valid (non-missing) values take part in each statistic
+    cer_ocr, cer_llm = cer_ocr[~np.isnan(cer_ocr)], cer_llm[~np.isnan(cer_llm)]
+    wer_ocr, wer_llm = wer_ocr[~np.isnan(wer_ocr)], wer_llm[~np.isnan(wer_llm)]
+
+    total_cer_ocr, total_cer_llm = cer_ocr.sum(), cer_llm.sum()
+    total_wer_ocr, total_wer_llm = wer_ocr.sum(), wer_llm.sum()
+
+    cer_reduction_percentage = ((total_cer_ocr - total_cer_llm) / total_cer_ocr * 100) if total_cer_ocr > 0 else None
+    wer_reduction_percentage = ((total_wer_ocr - total_wer_llm) / total_wer_ocr * 100) if total_wer_ocr > 0 else None
+
+    return {
+        'min_cer_ocr': _round(cer_ocr.min()) if len(cer_ocr) else None,
+        'max_cer_ocr': _round(cer_ocr.max()) if len(cer_ocr) else None,
+        'min_cer_llm': _round(cer_llm.min()) if len(cer_llm) else None,
+        'max_cer_llm': _round(cer_llm.max()) if len(cer_llm) else None,
+        'average_cer_llm': _round(cer_llm.mean()) if len(cer_llm) else None,
+        'average_wer_llm': _round(wer_llm.mean()) if len(wer_llm) else None,
+        'average_cer_ocr': _round(cer_ocr.mean()) if len(cer_ocr) else None,
+        'average_wer_ocr': _round(wer_ocr.mean()) if len(wer_ocr) else None,
+        'average_confidence': _round(confidence.mean()) if len(confidence) else None,
+        'cer_reduction_percentage': _round(cer_reduction_percentage) if cer_reduction_percentage is not None else None,
+        'wer_reduction_percentage': _round(wer_reduction_percentage) if wer_reduction_percentage is not None else None
+    }
+
+
+class RowView:
+    """Rows of a results file selected by an index array; slicing only builds the requested rows"""
+
+    def __init__(self, rows, indices=None):
+        self.rows = rows
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.rows) if self.indices is None else len(self.indices)
+
+    def __getitem__(self, key):
+        if self.indices is None:
+            return self.rows[key]
+        if isinstance(key, slice):
+            return [self.rows[i] for i in self.indices[key]]
+        return self.rows[self.indices[key]]
+
+
+class EvaluationResults:
+    """Parsed results file (list of per-line OCR and LLM outputs) with everything queries derive from it"""
+
+    def __init__(self, eval_data, path=None, stamp=None):
+        self.path = path
+        self.stamp = stamp
+        self.run_id = eval_data[0].get("run_id") if eval_data else None
+
+        self.rows = [
+            FileInfo(
+                file_name=item['file_name'],
+                ground_truth=item['ground_truth_label'],
+                predicted_text_ocr=item['OCR']['predicted_label'],
+                cer_ocr=item['OCR']['cer'],
+                predicted_text_llm=item['Prompt correcting']['predicted_label'],
+                cer_llm=item['Prompt correcting']['cer'],
+                confidence=parse_confidence(item['Prompt correcting'].get('confidence', 0)),
+                justification=item['Prompt correcting']['justification'],
+                wer_ocr=item['OCR']['wer'],
+                wer_llm=item['Prompt correcting']['wer'],
+                run_id=self.run_id
+            )
+            for item in eval_data
+        ]
+
+        # Columnar copies of the metrics (NaN for missing values)
+        self.cer_ocr = _column(row.cer_ocr for row in self.rows)
+        self.cer_llm = _column(row.cer_llm for row in self.rows)
+        self.wer_ocr = _column(row.wer_ocr for row in self.rows)
+        self.wer_llm = _column(row.wer_llm for row in self.rows)
+        self.confidence = np.array([row.confidence for row in self.rows], dtype=np.float64)
+        self.cer_delta = self.cer_llm - self.cer_ocr  # Negative when the LLM correction improved the line
+        self.file_names = np.array([row.file_name for row in self.rows], dtype=str)
+
+        self.statistics = _statistics(self.cer_ocr, self.cer_llm, self.wer_ocr, self.wer_llm, self.confidence)
+
+        # Lines where the LLM correction made the CER worse, better or left it unchanged
+        self.indices = {
+            'greater': np.flatnonzero(self.cer_llm > self.cer_ocr),
+            'lesser': np.flatnonzero(self.cer_llm < self.cer_ocr),
+            'equal': np.flatnonzero(self.cer_llm == self.cer_ocr)
+        }
+
+    def __len__(self):
+        return len(self.rows)
+
+    def count(self, comparison):
+        """Number of lines in a CER comparison set ('greater', 'lesser' or 'equal')"""
+        return len(self.indices[comparison])
+
+    def view(self, comparison=None):
+        """Rows of a CER comparison set, or all rows"""
+        return RowView(self.rows, self.indices[comparison] if comparison in COMPARISONS else None)
+
+    def select(self, comparison=None, ranges=None, file_name_prefix=None, order_by=None, descending=False,
+               top=None, top_k=None):
+        """
+        Rows matching a filter, optionally reduced to the top-k lines and sorted, computed on the metric columns.
+
+        :param comparison: CER comparison set ('greater', 'lesser' or 'equal'), None for all rows.
+        :param ranges: {metric: (min, max)} inclusive bounds on metrics of `METRICS` (None for an open bound).
+        :param file_name_prefix: Keep the lines whose file name starts with it.
+        :param order_by: Metric of `METRICS` or 'file_name' to sort by (ascending unless `descending`).
+        :param top: 'most_improved' (lowest CER delta) or 'most_degraded' (highest CER delta).
+        :param top_k: Number of lines kept by `top`.
+        :return: RowView.
+        """
+        mask = np.zeros(len(self.rows), dtype=bool)
+        mask[self.indices[comparison] if comparison in COMPARISONS else slice(None)] = True
+
+        # Missing values (NaN) never fall within a range
+        for metric, (low, high) in (ranges or {}).items():
+            values = getattr(self, metric)
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+
+        if file_name_prefix:
+            mask &= np.char.startswith(self.file_names, file_name_prefix)
+
+        indices = np.flatnonzero(mask)
+
+        if top in TOP_LINES:
+            # The k lines with the lowest (improved) or highest (degraded) CER delta, best first
+            delta = self.cer_delta[indices]
+            indices, delta = indices[~np.isnan(delta)], delta[~np.isnan(delta)]
+            key = delta if top == 'most_improved' else -delta
+            if top_k < len(indices):
+                selected = np.argpartition(key, top_k - 1)[:top_k]
+            else:
+                selected = np.arange(len(indices))
+            indices = indices[selected[np.argsort(key[selected], kind='stable')]]
+
+        if order_by is not None:
+            values = self.file_names if order_by == 'file_name' else getattr(self, order_by)
+            order = np.argsort(values[indices], kind='stable')
+            indices = indices[order[::-1] if descending else order]
+
+        return RowView(self.rows, indices)
+
+
+def get_evaluation_results(path):
+    """
+    Return the cached `EvaluationResults` of a results file, parsing it again if it changed on disk.
+
+    :param path: Path to a `results_*.json` file.
+    :return: EvaluationResults.
+    """
+    stamp = os.stat(path).st_mtime_ns
+    key = (path, stamp)
+
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    logging.info(f"Loading evaluation file: {path}")
+    with open(path, 'r') as eval_file:
+        results = EvaluationResults(json.load(eval_file), path, stamp)
+
+    with _lock:
+        # Older versions of the same file are never queried again
+        for stale in [k for k in _cache if k[0] == path and k != key]:
+            del _cache[stale]
+        _cache[key] = results
+        _cache.move_to_end(key)
+
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+    return results
@@ -0,0 +1,16 @@
+"""
+Results catalog of the LLM batch scripts (LLMs/src/utils/results_catalog.py), loaded from its file so that the
+server and the scripts share one implementation:
+    get_catalog: shared catalog of a results root (latest result file of every results directory)
+"""
+
+import importlib.util
+
+from constants import results_catalog_module
+
+_spec = importlib.util.spec_from_file_location("llm_results_catalog", results_catalog_module)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+ResultsCatalog = _module.ResultsCatalog
+get_catalog = _module.get_catalog
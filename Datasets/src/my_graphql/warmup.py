@@ -0,0 +1,51 @@
+"""
+Warm-up of the process-wide caches of the GraphQL server, run at startup (see gunicorn.conf.py):
+    warm_up: open the dataset files, parse the latest results files and index the run logs
+
+The first request then costs the same as any other. Run it in each worker process after the fork: HDF5 handles
+must not be inherited from a parent process.
+"""
+
+import glob
+import logging
+import os
+import time
+
+from constants import llm_outputs_path, llm_logs_path
+from my_graphql.utils.file_handler import DATASET_PATHS, dataset_hdf5_path
+from my_graphql.utils.hdf5_cache import get_dataset_file
+from my_graphql.utils.log_index import get_log_index
+from my_graphql.utils.results_cache import get_evaluation_results
+from my_graphql.utils.results_catalog import get_catalog
+
+
+def warm_up():
+    """Preload the dataset, results and log caches; files that fail to load are logged and skipped"""
+    start = time.perf_counter()
+    loaded = {'datasets': 0, 'results': 0, 'logs': 0}
+
+    for name_dataset in DATASET_PATHS:
+        hdf5_path = dataset_hdf5_path(name_dataset)
+        if os.path.exists(hdf5_path):
+            try:
+                get_dataset_file(hdf5_path)
+                loaded['datasets'] += 1
+            except Exception as e:
+                logging.warning(f"Warm-up: could not open {hdf5_path}: {e}")
+
+    if os.path.isdir(llm_outputs_path):
+        for results_path in get_catalog(llm_outputs_path).files():
+            try:
+                get_evaluation_results(results_path)
+                loaded['results'] += 1
+            except Exception as e:
+                logging.warning(f"Warm-up: could not load {results_path}: {e}")
+
+    for log_file in glob.glob(os.path.join(llm_logs_path, 'workflow_*.log')):
+        try:
+            get_log_index(log_file)
+            loaded['logs'] += 1
+        except Exception as e:
+            logging.warning(f"Warm-up: could not index {log_file}: {e}")
+
+    logging.info(f"Warm-up done in {time.perf_counter() - start:.2f}s: {loaded}")
@@ -0,0 +1,157 @@
+"""
+Ground truth index of the raw datasets, a `{line_id: text}` map per dataset:
+    bentham_index: parse `Transcriptions/` (one file per line) with a thread pool
+    washington_index: parse `ground_truth/transcription.txt`
+    iam_index: parse `ground_truth/lines.txt`
+
+Every index is cached in a pickle file under `cache_dir`, keyed by the mtime and size of its sources
+(and, for a directory, its mtime, entry count and newest entry mtime). When nothing changed the
+cached map is loaded instead of parsing the transcriptions again.
+"""
+
+import os
+import html
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.text_processing import correct_punctuation_spacing
+
+# Bump when the parsing/normalisation below changes, so existing caches are discarded
+INDEX_VERSION = 1
+
+
+def bentham_index(source, cache_dir=None, workers=16):
+    """
+    Ground truth of the Bentham dataset.
+
+    :param source: Path to the Bentham dataset source.
+    :param cache_dir: Directory of the cache file (None disables the cache).
+    :param workers: Threads reading the transcription files.
+    :return: Dictionary {line_id: text}.
+    """
+    transcriptions = os.path.join(source, "Transcriptions")
+
+    def parse():
+        gt_files = os.listdir(transcriptions)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            texts = executor.map(_read_bentham_file, [os.path.join(transcriptions, f) for f in gt_files])
+            return {os.path.splitext(gt_file)[0]: text for gt_file, text in zip(gt_files, texts)}
+
+    return _cached_index("bentham", _directory_key(transcriptions), parse, cache_dir)
+
+
+def washington_index(source, cache_dir=None):
+    """
+    Ground truth of the Washington dataset.
+
+    :param source: Path to the Washington dataset source.
+    :param cache_dir: Directory of the cache file (None disables the cache).
+    :return: Dictionary {line_id: text}.
+    """
+    transcription = os.path.join(source, "ground_truth", "transcription.txt")
+
+    def parse():
+        gt_dict = {}
+
+        for line in open(transcription).read().splitlines():
+            split = line.split()
+            split[1] = split[1].replace("-", "").replace("|", " ")
+            split[1] = split[1].replace("s_pt", ".").replace("s_cm", ",")
+            split[1] = split[1].replace("s_mi", "-").replace("s_qo", ":")
+            split[1] = split[1].replace("s_sq", ";").replace("s_et", "V")
+            split[1] = split[1].replace("s_bl", "(").replace("s_br", ")")
+            split[1] = split[1].replace("s_qt", "'").replace("s_GW", "G.W.")
+            split[1] = split[1].replace("s_", "")
+            gt_dict[split[0]] = split[1]
+
+        return gt_dict
+
+    return _cached_index("washington", _file_key(transcription), parse, cache_dir)
+
+
+def iam_index(source, cache_dir=None):
+    """
+    Ground truth of the IAM dataset.
+
+    :param source: Path to the IAM dataset source.
+    :param cache_dir: Directory of the cache file (None disables the cache).
+    :return: Dictionary {line_id: text}.
+    """
+    lines_path = os.path.join(source, "ground_truth", "lines.txt")
+
+    if not os.path.exists(lines_path):
+        raise FileNotFoundError(f"Ground truth file does not exist: {lines_path}")
+
+    def parse():
+        gt_dict = {}
+
+        for line in open(lines_path).read().splitlines():
+            if not line or line.startswith("#"):
+                continue
+            split = line.split()
+            gt_dict[split[0]] = correct_punctuation_spacing(" ".join(split[8:]).replace("|", " "))
+
+        return gt_dict
+
+    return _cached_index("iam", _file_key(lines_path), parse, cache_dir)
+
+
+def _read_bentham_file(path):
+    """Read one Bentham transcription and normalise it (HTML entities, <gap/> tags, whitespace)"""
+    with open(path) as file:
+        text = " ".join(file.read().splitlines())
+
+    text = html.unescape(text).replace("<gap/>", "")
+    return " ".join(text.split())
+
+
+def _file_key(path):
+    """Cache key of a single source file"""
+    stat = os.stat(path)
+    return [path, stat.st_mtime_ns, stat.st_size]
+
+
+def _directory_key(path):
+    """
+    Cache key of a directory of source files. The directory mtime changes when files are added,
+    removed or renamed; the newest entry mtime catches files edited in place.
+    """
+    count, newest = 0, 0
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            count += 1
+            newest = max(newest, entry.stat().st_mtime_ns)
+
+    return [path, os.stat(path).st_mtime_ns, count, newest]
+
+
+def _cached_index(name, key, parse, cache_dir):
+    """Return the cached index when its key matches, otherwise parse the sources and refresh the cache"""
+    key = [INDEX_VERSION] + key
+
+    if cache_dir is None:
+        return parse()
+
+    cache_file = os.path.join(cache_dir, f"{name}_gt_index.pkl")
+
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'rb') as file:
+                cached = pickle.load(file)
+            if cached.get("key") == key:
+                return cached["index"]
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass  # Unreadable cache, parse again
+
+    index = parse()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = f"{cache_file}.tmp"
+
+    with open(tmp_file, 'wb') as file:
+        pickle.dump({"key": key, "index": index}, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(tmp_file, cache_file)
+    return index
@@ -0,0 +1,66 @@
+"""
+HDF5 storage layout helpers:
+    compression_options: translate a codec name into h5py `create_dataset` keyword arguments
+    chunk_shape: chunk shape aligned to a number of lines
+    available_codecs: codecs usable in the current environment
+
+Codecs: 'none', 'lzf', 'gzip' or 'gzip:N' (N = 0..9), and, when the optional `hdf5plugin`
+package is installed, 'zstd[:N]' and 'blosc:CNAME[:N]' (e.g., 'blosc:zstd:5', 'blosc:lz4').
+Files written with a plugin codec need `import hdf5plugin` in the process that reads them.
+"""
+
+try:
+    import hdf5plugin
+except ImportError:
+    hdf5plugin = None
+
+
+def compression_options(codec):
+    """Return the h5py keyword arguments for a codec name"""
+
+    name, _, level = (codec or "none").lower().partition(":")
+
+    if name == "none":
+        return {}
+
+    if name == "lzf":
+        return {"compression": "lzf"}
+
+    if name == "gzip":
+        return {"compression": "gzip", "compression_opts": int(level) if level else 4}
+
+    if name in ("zstd", "blosc"):
+        if hdf5plugin is None:
+            raise ImportError(f"Codec '{codec}' requires the optional 'hdf5plugin' package.")
+
+        if name == "zstd":
+            return dict(hdf5plugin.Zstd(clevel=int(level) if level else 3))
+
+        cname, _, clevel = level.partition(":")
+        return dict(hdf5plugin.Blosc(cname=cname or "zstd", clevel=int(clevel) if clevel else 5,
+                                     shuffle=hdf5plugin.Blosc.SHUFFLE))
+
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+
+def chunk_shape(shape, chunk_lines):
+    """
+    Chunk shape holding `chunk_lines` whole lines, so a batch of that size decompresses exactly one chunk.
+    Return None (h5py automatic chunking) when no alignment is requested or the dataset is empty.
+    """
+
+    if not chunk_lines or shape[0] == 0:
+        return None
+
+    return (min(chunk_lines, shape[0]),) + tuple(shape[1:])
+
+
+def available_codecs():
+    """Codecs that can be used in the current environment"""
+
+    codecs = ["none", "lzf", "gzip:1", "gzip:4", "gzip:9"]
+
+    if hdf5plugin is not None:
+        codecs += ["zstd:3", "blosc:lz4:5", "blosc:zstd:5"]
+
+    return codecs
@@ -0,0 +1,77 @@
+"""
+Packed archive of the original encoded line images (PNG bytes), stored next to a dataset HDF5 file:
+    archive_path: location of the archive for a given HDF5 file
+    append_files: append image files to an open archive, returning their offsets and lengths
+    open_archive: read-only memory map of an archive
+    PackedImages: sequence of encoded images read from an archive
+
+The HDF5 file keeps the index: `{partition}/png_offset` and `{partition}/png_length` per line, and the
+archive file name in the `image_archive` attribute. Reading a line is then one slice of a single mapped
+file instead of an open/stat/read of one small file.
+"""
+
+import os
+import mmap
+
+import numpy as np
+
+
+def archive_path(target):
+    """Return the archive path for an HDF5 file (e.g., bentham_dataset.images.bin)"""
+
+    return f"{os.path.splitext(target)[0]}.images.bin"
+
+
+def append_files(file, paths):
+    """
+    Append the content of image files to an archive opened for binary writing.
+
+    :param file: Archive file object, positioned at its end.
+    :param paths: Image file paths.
+    :return: (offsets, lengths) int64 arrays, aligned with `paths`.
+    """
+    offsets = np.empty(len(paths), dtype=np.int64)
+    lengths = np.empty(len(paths), dtype=np.int64)
+
+    for i, path in enumerate(paths):
+        with open(path, 'rb') as image_file:
+            data = image_file.read()
+
+        offsets[i] = file.tell()
+        lengths[i] = len(data)
+        file.write(data)
+
+    return offsets, lengths
+
+
+def open_archive(path):
+    """Memory map an archive for reading (an empty archive maps to empty bytes)"""
+
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackedImages:
+    """Sequence of encoded images (bytes) stored in an archive, read only when indexed or sliced"""
+
+    def __init__(self, archive, offsets, lengths):
+        """
+        :param archive: Memory-mapped archive (see `open_archive`).
+        :param offsets: Offsets of the images in the archive.
+        :param lengths: Byte lengths of the images.
+        """
+        self.archive = archive
+        self.offsets = offsets
+        self.lengths = lengths
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        offset = int(self.offsets[index])
+        return bytes(self.archive[offset:offset + int(self.lengths[index])])
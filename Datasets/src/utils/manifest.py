@@ -0,0 +1,94 @@
+"""
+Per-line build manifest stored next to a dataset HDF5 file:
+    manifest_path: location of the manifest for a given HDF5 file
+    load_manifest / save_manifest: read and atomically write the manifest
+    build_records: describe every line (image stat, image hash, ground truth hash)
+    index_records: map image paths of a manifest to their (partition, row, record)
+
+A record is the list [image_path, mtime_ns, size, image_sha1, gt_sha1]. The image is only
+re-hashed when its mtime or size differ from the previous manifest.
+"""
+
+import os
+import json
+import hashlib
+
+PATH, MTIME, SIZE, IMAGE_HASH, GT_HASH = range(5)
+
+
+def manifest_path(target):
+    """Return the manifest path for an HDF5 file (e.g., bentham_dataset.manifest.json)"""
+
+    return f"{os.path.splitext(target)[0]}.manifest.json"
+
+
+def load_manifest(path):
+    """Load a manifest, returning None if it is missing or unreadable"""
+
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(path, params, records):
+    """Write the manifest next to the HDF5 file, replacing the previous one atomically"""
+
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, 'w') as file:
+        json.dump({"params": params, "partitions": records}, file)
+
+    os.replace(tmp_path, path)
+
+
+def index_records(manifest):
+    """Map every image path of a manifest to its (partition, row, record)"""
+
+    if not manifest:
+        return dict()
+
+    return {record[PATH]: (pt, i, record)
+            for pt, records in manifest['partitions'].items()
+            for i, record in enumerate(records)}
+
+
+def file_sha1(path):
+    """SHA-1 of a file's content"""
+
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def text_sha1(text):
+    """SHA-1 of a ground truth text"""
+
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def build_records(lines, previous_index):
+    """
+    Describe every line of a partition.
+
+    :param lines: Iterable of (full image path, ground truth text), consumed lazily.
+    :param previous_index: Output of `index_records` for the previous manifest (may be empty).
+    :return: List of records.
+    """
+    records = []
+
+    for image_path, text in lines:
+        stat = os.stat(image_path)
+        previous = previous_index.get(image_path)
+
+        if previous and previous[2][MTIME] == stat.st_mtime_ns and previous[2][SIZE] == stat.st_size:
+            image_hash = previous[2][IMAGE_HASH]  # Unchanged on disk, no need to read it again
+        else:
+            image_hash = file_sha1(image_path)
+
+        records.append([image_path, stat.st_mtime_ns, stat.st_size, image_hash, text_sha1(text)])
+
+    return records
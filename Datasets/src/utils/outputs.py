@@ -0,0 +1,58 @@
+"""
+Extra model inputs derived by the dataset build from the same image decode as the Flor tensor (`dt`):
+    TrOCRPixels: TrOCR-ready pixel values (resized, rescaled and normalized like `TrOCRProcessor`)
+    store_path: location of the store of an output for a given HDF5 file and stored partition
+    create_store / open_store: memory-mapped `.npy` stores, one per stored partition
+
+An output is a picklable callable with a `name`, a per-line `shape` and `dtype`, and `params()` describing it.
+The HDF5 file records every output it was built with in a `{name}_params` attribute (JSON). The train
+subsets are prefixes of 'train_100', so they read the first rows of the 'train_100' store.
+"""
+
+import os
+
+import numpy as np
+from PIL import Image
+
+
+class TrOCRPixels:
+    """
+    TrOCR encoder input: the grayscale line resized to `size` x `size` (bilinear, like the ViT image processor),
+    rescaled to [0, 1] and normalized with `mean` and `std`, stored as a single float16 channel.
+    The processor feeds the same value to the three RGB channels, so readers broadcast it.
+    """
+
+    name = "trocr"
+    dtype = np.float16
+
+    def __init__(self, size=384, mean=0.5, std=0.5):
+        self.size = size
+        self.mean = mean
+        self.std = std
+        self.shape = (size, size)
+
+    def params(self):
+        return {"name": self.name, "size": self.size, "mean": self.mean, "std": self.std}
+
+    def __call__(self, img):
+        img = Image.fromarray(img).resize((self.size, self.size), resample=Image.BILINEAR)
+        pixels = np.asarray(img, dtype=np.float32) / 255.0
+        return ((pixels - self.mean) / self.std).astype(self.dtype)
+
+
+def store_path(target, name, partition):
+    """Return the store path of an output (e.g., bentham_dataset.trocr.train_100.npy)"""
+
+    return f"{os.path.splitext(target)[0]}.{name}.{partition}.npy"
+
+
+def create_store(path, output, lines):
+    """Create a writable memory-mapped store for `lines` rows of an output"""
+
+    return np.lib.format.open_memmap(path, mode='w+', dtype=output.dtype, shape=(lines,) + tuple(output.shape))
+
+
+def open_store(path, mode='r'):
+    """Open an existing store as a memory map"""
+
+    return np.load(path, mmap_mode=mode)
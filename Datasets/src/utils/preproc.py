@@ -4,6 +4,7 @@ Data preproc functions:
     augmentation: apply variations to a list of images
     normalization: apply normalization and variations on images (if required)
     preprocess: main function for preprocess
+    preprocess_targets: decode every image once into the (N, W, H) buffer and the buffers of extra model inputs
 """
 
 import re
@@ -97,9 +98,7 @@ def preprocess(img, input_size):
 
     def imread(path):
         img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-        u, i = np.unique(np.array(img).flatten(), return_inverse=True)
-        background = int(u[np.argmax(np.bincount(i))])
-        return img, background
+        return img, background(img)
 
     if isinstance(img, str):
         img, bg = imread(img)
@@ -117,8 +116,56 @@ def preprocess(img, input_size):
 
         img = np.asarray(img[boundbox[0]:boundbox[1], boundbox[2]:boundbox[3]], dtype=np.uint8)
 
-    wt, ht, _ = input_size
-    h, w = np.asarray(img).shape
+    target = np.empty(input_size[:2], dtype=np.uint8)
+    _resize_into(np.asarray(img), bg, target)
+
+    return target
+
+
+def preprocess_targets(paths, input_size, outputs=()):
+    """
+    Decode every image once and derive all the model inputs from it.
+
+    :param paths: Image paths, or encoded image bytes.
+    :param input_size: The size of the input image (width, height, channels) of the `preprocess` tensor.
+    :param outputs: Extra outputs, callables turning a grayscale image into an array of their `shape` and `dtype`
+                    (see `utils.outputs`).
+    :return: ((N, W, H) uint8 buffer, [(N,) + output.shape buffer for each output]).
+    """
+
+    out = np.empty((len(paths),) + tuple(input_size[:2]), dtype=np.uint8)
+    extra = [np.empty((len(paths),) + tuple(output.shape), dtype=output.dtype) for output in outputs]
+
+    for i, path in enumerate(paths):
+        img = read_gray(path)
+        _resize_into(img, background(img), out[i])
+
+        for buffer, output in zip(extra, outputs):
+            buffer[i] = output(img)
+
+    return out, extra
+
+
+def read_gray(path):
+    """Decode an image path or encoded image bytes as a grayscale uint8 array"""
+
+    if isinstance(path, bytes):
+        return cv2.imdecode(np.frombuffer(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+
+    return cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+
+
+def background(img):
+    """Most frequent grey level of a uint8 image (256-bin histogram, ties resolved to the darkest level)"""
+
+    return int(np.argmax(np.bincount(img.ravel(), minlength=256)))
+
+
+def _resize_into(img, bg, target):
+    """Scale `img` to fit the (W, H) `target` view and write it transposed, padding with the `bg` grey level"""
+
+    wt, ht = target.shape
+    h, w = img.shape
     f = max((w / wt), (h / ht))
 
     new_size = (max(min(wt, int(w / f)), 1), max(min(ht, int(h / f)), 1))
@@ -128,8 +175,5 @@ def preprocess(img, input_size):
 
     img = cv2.resize(img, new_size)
 
-    target = np.ones([ht, wt], dtype=np.uint8) * bg
-    target[0:new_size[1], 0:new_size[0]] = img
-    img = cv2.transpose(target)
-
-    return img
+    target.fill(bg)
+    target[0:new_size[0], 0:new_size[1]] = img.T
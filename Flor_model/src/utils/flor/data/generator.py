@@ -10,6 +10,11 @@ import os
 import h5py
 import numpy as np
 
+try:
+    import hdf5plugin  # noqa: F401  Registers the optional blosc/zstd filters used by some dataset builds
+except ImportError:
+    hdf5plugin = None
+
 from utils.flor.data import preproc as pp
 
 
@@ -0,0 +1,70 @@
+# src/check_lexicon_index.py
+
+"""
+Equivalence check and timing of the lexicon index against the previous difflib path:
+for every word of the OCR results of a dataset, `LexiconIndex.close_matches` must return exactly
+`difflib.get_close_matches` over the flat token list of each suggestion dictionary.
+
+Usage: python check_lexicon_index.py [dataset] [number_of_words]
+"""
+
+import os
+import sys
+import time
+from difflib import get_close_matches
+
+from constants import training_suggestion_path, results_from_Flor_path
+from utils.io_utils import load_from_json, get_latest_result
+from utils.lexicon_index import LexiconIndex
+
+DICTIONARIES = ['bentham', 'iam', 'washington', 'whitefield']
+
+
+def ocr_words(dataset, limit):
+    """Distinct words of the latest OCR predictions of a dataset, in order of appearance"""
+    words = dict()
+    for train_size in ['train_25', 'train_50', 'train_75', 'train_100']:
+        result_path = get_latest_result(os.path.join(results_from_Flor_path, dataset, train_size))
+        if result_path is None:
+            continue
+        for item in load_from_json(result_path):
+            for word in item['predicted_label'].split():
+                words.setdefault(word)
+                if len(words) == limit:
+                    return list(words)
+    return list(words)
+
+
+def legacy_close_matches(word, train_set_lines):
+    """Previous lookup: the flat token list rebuilt and scanned for every word"""
+    all_words = [line.split() for line in train_set_lines]
+    flat_list = [item for sublist in all_words for item in sublist]
+    return get_close_matches(word, flat_list, n=3, cutoff=0.85)
+
+
+if __name__ == '__main__':
+    dataset = sys.argv[1] if len(sys.argv) > 1 else 'washington'
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    words = ocr_words(dataset, limit)
+    print(f"{len(words)} OCR words from {dataset}")
+
+    for dictionary in DICTIONARIES:
+        train_set_lines = list(load_from_json(os.path.join(training_suggestion_path, f"{dictionary}.json")).values())
+
+        start = time.perf_counter()
+        expected = [legacy_close_matches(word, train_set_lines) for word in words]
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = LexiconIndex(train_set_lines)
+        build_time = time.perf_counter() - start
+        actual = [index.close_matches(word, n=3, cutoff=0.85) for word in words]
+        index_time = time.perf_counter() - start
+
+        mismatches = [(word, e, a) for word, e, a in zip(words, expected, actual) if e != a]
+        print(f"{dictionary}: {len(index)} distinct words, difflib {legacy_time:.2f}s, "
+              f"index {index_time:.3f}s (build {build_time:.3f}s), x{legacy_time / index_time:.0f}, "
+              f"mismatches: {len(mismatches)}")
+        for mismatch in mismatches[:5]:
+            print("  ", mismatch)
+        assert not mismatches
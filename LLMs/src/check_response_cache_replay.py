@@ -0,0 +1,108 @@
+# src/check_response_cache_replay.py
+
+"""
+Replay check of the response cache: a cache written by one run of GptTextProcessingM1 must replay under other
+string hash seeds (PYTHONHASHSEED) with zero misses, i.e. the prompts must not depend on the process.
+
+The first run (seed 1, readwrite) sends its requests to a local stub server answering every prompt with a fixed
+text; the other runs (seeds 2 to 5, LLM_CACHE_MODE=replay) have no server and fail on any miss.
+Each run is a separate process with its own seed, working on a temporary cache file.
+
+Usage: python check_response_cache_replay.py [dataset] [number_of_lines]
+"""
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from constants import training_suggestion_path, results_from_Flor_path
+from utils.io_utils import load_from_json, get_latest_result
+
+REPLAY_SEEDS = ['2', '3', '4', '5']
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat completion endpoint answering a prompt with a text derived from its hash"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt_hash = hashlib.sha256(body['messages'][0]['content'].encode('utf-8')).hexdigest()
+        content = f"Confidence: {int(prompt_hash[:4], 16) % 100}\nJustification: {prompt_hash[:12]}"
+        response = json.dumps({
+            'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+
+def run_strategy(dataset, number_of_lines):
+    """Run GptTextProcessingM1 over the first OCR lines of a dataset; print the cache counters as JSON"""
+    from evaluations.evaluate_mistral import evaluate_and_correct_ocr_results_gpt
+    from prompts.gpt.methods.GptTextProcessingM1 import GptTextProcessingM1
+    from utils.aux_processing import suggest_corrections_for_ocr_text_m1
+    from utils.response_cache import get_response_cache
+
+    loaded_data = load_from_json(get_latest_result(os.path.join(results_from_Flor_path, dataset, 'train_25')))
+    loaded_data = loaded_data[:number_of_lines]
+    train_set_lines = list(load_from_json(os.path.join(training_suggestion_path, f"{dataset}.json")).values())
+
+    # Words with several suggestions are the ones whose prompt order could depend on the process
+    strategy = GptTextProcessingM1()
+    several = sum(len(set(similar_words)) > 1
+                  for item in loaded_data
+                  for _, similar_words in suggest_corrections_for_ocr_text_m1(
+                      item['predicted_label'], train_set_lines, strategy.suggestions_memory))
+
+    logger = logging.getLogger('check_response_cache_replay')
+    evaluate_and_correct_ocr_results_gpt(loaded_data, train_set_lines, strategy, 'check', 'gpt-4o-mini', 'stub',
+                                         'gpt-4o-mini', logger)
+    print(json.dumps({**get_response_cache().stats(), 'several_suggestions': several}))
+
+
+def run_process(seed, mode, cache_dir, base_url, dataset, number_of_lines):
+    environment = dict(os.environ, PYTHONHASHSEED=seed, LLM_CACHE_MODE=mode, OPENAI_BASE_URL=base_url,
+                       LLM_CACHE_PATH=os.path.join(cache_dir, 'responses.sqlite'))
+    completed = subprocess.run([sys.executable, __file__, '--run', dataset, str(number_of_lines)], env=environment,
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if completed.returncode != 0:
+        print(completed.stderr)
+        raise AssertionError(f"Run with PYTHONHASHSEED={seed} ({mode}) failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--run']:
+        run_strategy(sys.argv[2], int(sys.argv[3]))
+        sys.exit(0)
+
+    dataset = sys.argv[1] if len(sys.argv) > 1 else 'washington'
+    number_of_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        written = run_process('1', 'readwrite', cache_dir, base_url, dataset, number_of_lines)
+        print(f"PYTHONHASHSEED=1 (readwrite): {written}")
+        server.shutdown()
+        assert written['several_suggestions'] > 0, "No word with several suggestions: the check proves nothing"
+
+        for seed in REPLAY_SEEDS:
+            replayed = run_process(seed, 'replay', cache_dir, 'http://127.0.0.1:9/v1', dataset, number_of_lines)
+            print(f"PYTHONHASHSEED={seed} (replay): {replayed}")
+            assert replayed['misses'] == 0 and replayed['hits'] == written['misses'] + written['hits']
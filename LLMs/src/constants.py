@@ -8,4 +8,14 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 results_from_TrOCR_path = os.path.join(current_dir, '../../TrOCR_model/results')
 results_from_Flor_path = os.path.join(current_dir, '../../Flor_model/results')
 results_llm = os.path.join(current_dir, '../results')
-training_suggestion_path = os.path.join(current_dir, '../training_sets_files')
\ No newline at end of file
+training_suggestion_path = os.path.join(current_dir, '../training_sets_files')
+
+# Persistent cache of the close-word suggestions, shared by runs and worker processes
+suggestion_cache_path = os.path.join(current_dir, '../cache/suggestions.sqlite')
+
+# Content-addressed cache of the LLM responses (mode from LLM_CACHE_MODE, see src/utils/response_cache.py);
+# LLM_CACHE_PATH points CI and benchmarks to their own store
+response_cache_path = os.getenv('LLM_CACHE_PATH', os.path.join(current_dir, '../cache/responses.sqlite'))
+
+# Request files of the OpenAI batch mode (src/utils/openai_batch.py), one directory per run
+batch_requests_path = os.path.join(current_dir, '../batches')
@@ -1,6 +1,10 @@
 # src/evaluation/evaluate_mistral.py
 
+from concurrent.futures import ThreadPoolExecutor
+
 from evaluations.metrics_evaluation import cer_only, wer_only
+from utils.logger import LineLogger
+from utils.openai_engine import MAX_CONCURRENCY
 
 
 def evaluate_and_correct_ocr_results_mistral(loaded_data, train_set_lines, text_processing_strategy, pipe,
@@ -43,34 +47,37 @@ def evaluate_and_correct_ocr_results_mistral(loaded_data, train_set_lines, text_
 
 
 def evaluate_and_correct_ocr_results_gpt(loaded_data, train_set_lines, text_processing_strategy, run_id, model_name,
-                                         openai_token, llm_name_2, logger, max_lines=None):
+                                         openai_token, llm_name_2, logger, max_lines=None, max_workers=None):
 
     """
     Generalized function to evaluate and correct OCR results using either the Mistral or GPT model.
 
+    Lines are processed concurrently by `max_workers` threads; their OpenAI calls share the engine of
+    utils/openai_engine.py, which bounds the requests in flight and the request and token rates.
+    The results keep the order of `loaded_data`, and the log messages of a line start with its file name.
+
     Args:
         loaded_data (list): A list of dictionaries containing OCR data (file_name, predicted_label, ground_truth_label, etc.).
         train_set_lines (list): A list of lines from the training set for suggestion purposes.
         text_processing_strategy (TextProcessingStrategy): The strategy for correcting OCR text (e.g., Mistral or GPT).
         *model_args: Additional arguments required by the specific model (e.g., pipeline, tokenizer for Mistral or model_name for GPT).
+        max_lines (int): Only process the first lines (all lines if None).
+        max_workers (int): Number of lines processed at once (default: the engine concurrency limit).
 
     Returns:
         list: A list of dictionaries with the evaluated and corrected OCR results.
     """
-    results = []
-
-    for idx, item in enumerate(loaded_data):
-
-        if max_lines is not None and idx >= max_lines:
-            break
-
+    def evaluate_line(item):
         ocr_text = item['predicted_label']
         ground_truth_label = item['ground_truth_label']
 
+        # Lines run concurrently: each message of the line's trace starts with its file name
+        line_logger = LineLogger(logger, item['file_name'])
+
         # For Mistral: Pass (ocr_text, train_set_lines, pipe, mistral_tokenizer)
         # For GPT: Pass (ocr_text, train_set_lines, model_name)
         corrected_text_line, confidence, justification = text_processing_strategy.check_and_correct_text_line(
-            ocr_text, train_set_lines, model_name, openai_token, llm_name_2, logger
+            ocr_text, train_set_lines, model_name, openai_token, llm_name_2, line_logger
         )
 
         # Calculate CER only if the text line was corrected
@@ -81,8 +88,7 @@ def evaluate_and_correct_ocr_results_gpt(loaded_data, train_set_lines, text_proc
             cer_corrected = cer_only([corrected_text_line], [ground_truth_label])
             wer_mistral = wer_only([corrected_text_line], [ground_truth_label])
 
-        # Append the result
-        results.append({
+        return {
             'run_id': run_id,
             'file_name': item['file_name'],
             'ground_truth_label': ground_truth_label,
@@ -98,6 +104,12 @@ def evaluate_and_correct_ocr_results_gpt(loaded_data, train_set_lines, text_proc
                 'confidence': confidence,  # Placeholder for confidence (if applicable)
                 'justification': justification  # Placeholder for justification (if applicable)
             }
-        })
+        }
+
+    items = loaded_data if max_lines is None else loaded_data[:max_lines]
+
+    # map() returns the results in the order of the lines, whatever order they complete in
+    with ThreadPoolExecutor(max_workers=max_workers or MAX_CONCURRENCY) as executor:
+        results = list(executor.map(evaluate_line, items))
 
     return results
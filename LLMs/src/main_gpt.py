@@ -1,8 +1,9 @@
 # src/main_gpt.py
 
 import os
+import sys
 
-from constants import training_suggestion_path, results_llm
+from constants import training_suggestion_path, results_llm, batch_requests_path
 from evaluations.evaluate_mistral import evaluate_and_correct_ocr_results_gpt
 from llm.llm_factory import LLMFactory
 from prompts.gpt.methods.GptTextProcessingM1 import GptTextProcessingM1
@@ -10,6 +11,8 @@ from prompts.gpt.methods.GptTextProcessingM2 import GptTextProcessingM2
 from utils.aux_processing import extract_text_lines_from_train_data
 from utils.io_utils import get_latest_result_for_datasets, load_from_json, create_testing_file
 from utils.logger import setup_logger
+from utils.openai_batch import OpenAIBatchBackend, run_batch_stages
+from utils.response_cache import get_response_cache
 import uuid
 
 # llm_name_2 = "gpt-3.5-turbo"
@@ -18,11 +21,14 @@ gpt_llm = LLMFactory.get_llm(llm_name_2)
 mistral_tokenizer = gpt_llm.tokenizer
 llms = [llm_name_2]
 model_ocr = "Flor_model"
-name_dataset = 'iam'
+# The controller passes the dataset that has just been built (default: IAM)
+name_dataset = sys.argv[1] if len(sys.argv) > 1 else 'iam'
 datasets = [name_dataset]
 train_sizes = ['train_25', 'train_50', 'train_75', 'train_100']
 train_suggestion = ['', 'iam']
 # train_suggestion = ['']
+# Answer the prompts of each stage with the OpenAI Batch API before the evaluation (no interactive latency)
+use_batch_api = False
 latest_results = get_latest_result_for_datasets(llms, datasets, train_sizes, model_ocr)
 
 # Get the latest OCR results for the GPT model
@@ -49,7 +55,6 @@ for llm, dataset, train_size, result_path in latest_results:
 
         # Initialize the GPTTextProcessingM1 strategy
         for text_processing_strategy in text_processing_strategies:
-            text_processing_strategy.suggestions_memory.clear()
             run_id = str(uuid.uuid4())
 
             log_file_path = f"../logs/workflow_{dataset}_{model_ocr}_{llm}_{text_processing_strategy.get_name_method()}_{train_size}_{dict_suggestion}.log"
@@ -57,7 +62,23 @@ for llm, dataset, train_size, result_path in latest_results:
 
             logger.info(
                 f"=== Running for '{dataset}' with '{train_size}' and suggestion dictionary '{dict_suggestion}' "
-                f"| {text_processing_strategy.get_name_method()} | Run ID: {run_id} ===")        # Run the evaluation and correction process
+                f"| {text_processing_strategy.get_name_method()} | Run ID: {run_id} ===")
+
+            if use_batch_api:
+                # Stage by stage, the batch results fill the response cache the evaluation below reads from
+                run_batch_stages(
+                    loaded_data,
+                    train_set_lines,
+                    text_processing_strategy,
+                    gpt_llm.model_name,
+                    gpt_llm.openai_token,
+                    llm_name_2,
+                    OpenAIBatchBackend(gpt_llm.openai_token),
+                    os.path.join(batch_requests_path, run_id),
+                    logger
+                )
+
+            # Run the evaluation and correction process
             evaluation_results = evaluate_and_correct_ocr_results_gpt(
                 loaded_data,
                 train_set_lines,
@@ -76,3 +97,4 @@ for llm, dataset, train_size, result_path in latest_results:
             logger.info(
                 f"=== Evaluation for '{dataset}' with '{train_size}' and suggestion dictionary '{dict_suggestion}' "
                 f"completed and results saved | {text_processing_strategy.get_name_method()} | Run ID: {run_id} ===")
+            logger.info(f"LLM response cache: {get_response_cache().stats()}")
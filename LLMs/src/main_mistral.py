@@ -9,6 +9,7 @@ from prompts.mistral.methods.mistral_text_processing_m2 import MistralTextProces
 from utils.aux_processing import extract_text_lines_from_train_data
 from utils.io_utils import get_latest_result_for_datasets, load_from_json, create_testing_file
 from utils.logger import setup_logger
+from utils.response_cache import get_response_cache
 import uuid
 
 llm_name_1 = "mistralai/Mistral-7B-v0.1"
@@ -43,7 +44,6 @@ for llm, dataset, train_size, result_path in latest_results:
             train_set_lines = extract_text_lines_from_train_data(train_set_lines)
 
         for text_processing_strategy in text_processing_strategies:
-            text_processing_strategy.suggestions_memory.clear()
             run_id = str(uuid.uuid4())
 
             log_file_path = f"./logs/workflow_{dataset}_{model_ocr}_{llm}_{text_processing_strategy.get_name_method()}_{train_size}_{dict_suggestion}.log"
@@ -73,3 +73,4 @@ for llm, dataset, train_size, result_path in latest_results:
             logger.info(
                 f"=== Evaluation for '{dataset}' with '{train_size}' and suggestion dictionary '{dict_suggestion}' "
                 f"completed and results saved | {text_processing_strategy.get_name_method()} | Run ID: {run_id} ===")
+            logger.info(f"LLM response cache: {get_response_cache().stats()}")
@@ -1,9 +1,9 @@
 # ./prompts/gpt/methods/GptTextProcessingM1.py
 
 import re
-import time
 
 from prompts.gpt.GPTProcessingStrategy import TextProcessingStrategy
+from utils.suggestion_cache import get_suggestion_cache
 from utils.aux_processing import suggest_corrections_for_ocr_text_m1, count_tokens_gpt, calculate_pipe_openai, \
     detect_immediate_repeated_words, detect_close_repeated_word_sequences, clean_text
 
@@ -11,7 +11,7 @@ from utils.aux_processing import suggest_corrections_for_ocr_text_m1, count_toke
 class GptTextProcessingM1(TextProcessingStrategy):
 
     def __init__(self):
-        self.suggestions_memory = {}
+        self.suggestions_memory = get_suggestion_cache()  # Shared by all runs and processes
 
     def get_name_method(self):
         return "method_1"
@@ -46,7 +46,7 @@ class GptTextProcessingM1(TextProcessingStrategy):
 
     def correct_with_suggestions(self, ocr_text, suggestions, model_name, openai_token, llm_name_2, logger):
         suggestion_part = "\n".join(
-            f"Original word from the text line: {ocr_word}, Suggestions for corrections: {', '.join(set(similar_words))}"
+            f"Original word from the text line: {ocr_word}, Suggestions for corrections: {', '.join(dict.fromkeys(similar_words))}"
             for ocr_word, similar_words in suggestions if similar_words and set(similar_words) != {ocr_word}
         )
 
@@ -78,26 +78,11 @@ class GptTextProcessingM1(TextProcessingStrategy):
         )
 
         tokens_prompt = count_tokens_gpt(system_prompt, llm_name_2) + 25
-        # Retry logic for handling rate limiting (429 Too Many Requests)
-        max_retries = 5
-        retry_delay = 5  # Start with 5 seconds
-        response = None
+        # Rate limits (429) and transient errors are retried by the engine (utils/openai_engine.py)
+        response = calculate_pipe_openai(model_name, system_prompt, tokens_prompt, openai_token)
 
-        for attempt in range(max_retries):
-            response = calculate_pipe_openai(model_name, system_prompt, tokens_prompt, openai_token)
-
-            if response is not None:
-                # Break the loop if the response is valid
-                break
-
-            # If the response is None, wait and retry
-            logger.info(f"Rate limit reached. Retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Exponential backoff
-
-            # Check if the response is still None after retries
         if response is None:
-            logger.error("Failed to retrieve a valid response from OpenAI after multiple attempts.")
+            logger.error("Failed to retrieve a valid response from OpenAI after the engine retries.")
             return ocr_text  # Return original text if the correction fails
 
         try:
@@ -169,22 +154,11 @@ class GptTextProcessingM1(TextProcessingStrategy):
 
         # Calculate the tokens and prepare for the API call
         tokens_prompt = count_tokens_gpt(system_prompt, llm_name_2) + 25
-        max_retries = 5
-        retry_delay = 5  # Start with 5 seconds
-        response = None
-
-        for attempt in range(max_retries):
-            response = calculate_pipe_openai(model_name, system_prompt, tokens_prompt, openai_token)
-
-            if response is not None:
-                break
-
-            logger.info(f"Rate limit reached. Retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Exponential backoff
+        # Rate limits (429) and transient errors are retried by the engine (utils/openai_engine.py)
+        response = calculate_pipe_openai(model_name, system_prompt, tokens_prompt, openai_token)
 
         if response is None:
-            logger.error("Failed to retrieve a valid response from OpenAI after multiple attempts.")
+            logger.error("Failed to retrieve a valid response from OpenAI after the engine retries.")
             return text_line  # Return original text if the correction fails
 
         try:
@@ -230,23 +204,11 @@ class GptTextProcessingM1(TextProcessingStrategy):
 
         # Calculate tokens required for the prompt
         tokens_prompt = count_tokens_gpt(system_prompt, llm_name_2) + 100
-        max_retries = 5
-        retry_delay = 5  # Start with 5 seconds
-        response = None
-
-        # Retry logic for handling rate limits (429 Too Many Requests)
-        for attempt in range(max_retries):
-            response = calculate_pipe_openai(model_name, system_prompt, tokens_prompt, openai_token)
-
-            if response is not None:
-                break  # Exit the loop if a valid response is obtained
-
-            logger.info(f"Rate limit reached. Retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Exponential backoff for retry delays
+        # Rate limits (429) and transient errors are retried by the engine (utils/openai_engine.py)
+        response = calculate_pipe_openai(model_name, system_prompt, tokens_prompt, openai_token)
 
         if response is None:
-            logger.error("Failed to retrieve a valid response from OpenAI after multiple attempts.")
+            logger.error("Failed to retrieve a valid response from OpenAI after the engine retries.")
             return None, None  # Return None if the evaluation fails
 
         try:
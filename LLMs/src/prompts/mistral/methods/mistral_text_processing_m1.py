@@ -2,13 +2,14 @@
 
 import re
 from prompts.mistral.text_processing_base import TextProcessingStrategy
+from utils.suggestion_cache import get_suggestion_cache
 from utils.aux_processing import count_tokens, calculate_pipe, detect_immediate_repeated_words, \
     detect_close_repeated_word_sequences, suggest_corrections_for_ocr_text_m1
 
 
 class MistralTextProcessingM1(TextProcessingStrategy):
     def __init__(self):
-        self.suggestions_memory = {}
+        self.suggestions_memory = get_suggestion_cache()  # Shared by all runs and processes
 
     def get_name_method(self):
         return "method_1"
@@ -43,7 +44,7 @@ class MistralTextProcessingM1(TextProcessingStrategy):
 
     def correct_with_suggestions(self, ocr_text, suggestions, pipe, tokenizer, logger):
         suggestion_part = "\n".join(
-            f"Original word from the text line: {ocr_word}, Suggestions for corrections: {', '.join(set(similar_words))}"
+            f"Original word from the text line: {ocr_word}, Suggestions for corrections: {', '.join(dict.fromkeys(similar_words))}"
             for ocr_word, similar_words in suggestions if similar_words and set(similar_words) != {ocr_word}
         )
 
@@ -2,6 +2,7 @@
 
 import re
 from prompts.mistral.text_processing_base import TextProcessingStrategy
+from utils.suggestion_cache import get_suggestion_cache
 from utils.aux_processing import calculate_pipe, count_tokens, detect_immediate_repeated_words, \
     detect_close_repeated_word_sequences, detect_similar_immediate_repeated_words, has_misplaced_punctuation, \
     check_missing_or_extra_words, suggest_corrections_for_ocr_text_m2
@@ -13,7 +14,7 @@ logger = setup_logger()
 class MistralTextProcessingM2(TextProcessingStrategy):
 
     def __init__(self):
-        self.suggestions_memory = {}
+        self.suggestions_memory = get_suggestion_cache()  # Shared by all runs and processes
 
     def get_name_method(self):
         return "method_2"
@@ -153,7 +154,7 @@ class MistralTextProcessingM2(TextProcessingStrategy):
             return ocr_text
 
         suggestion_part = "\n".join(
-            f"Original word from the text line: {ocr_word}, Suggestions for corrections: {', '.join(set(similar_words))}"
+            f"Original word from the text line: {ocr_word}, Suggestions for corrections: {', '.join(dict.fromkeys(similar_words))}"
             for ocr_word, similar_words in suggestions if similar_words and set(similar_words) != {ocr_word}
         )
 
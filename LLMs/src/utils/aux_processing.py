@@ -1,16 +1,44 @@
 # src/utils/aux_processing.py
 
+import json
 from collections import defaultdict
-from difflib import get_close_matches, SequenceMatcher
+from difflib import SequenceMatcher
 
 import openai
-from openai import OpenAI
 import tiktoken
+from openai.types.chat import ChatCompletion
 
+from utils.lexicon_index import get_lexicon_index
+from utils.openai_batch import pending_request
+from utils.openai_engine import get_engine
+from utils.response_cache import get_response_cache, ResponseCacheMiss, SAMPLING_SEED
 
-def calculate_pipe(pipe, prompt, nummer_length, top_k):
-    return pipe(prompt, max_length=nummer_length, do_sample=True, top_k=top_k, num_return_sequences=1,
-                pad_token_id=pipe.tokenizer.eos_token_id)
+
+def calculate_pipe(pipe, prompt, nummer_length, top_k, seed=SAMPLING_SEED):
+    cache = get_response_cache()
+
+    # Sampling only gives the same output again with a seed: unseeded samples are never cached
+    if seed is None:
+        if cache.mode == 'replay':
+            raise ResponseCacheMiss("Unseeded sampled generations cannot be replayed: set LLM_SAMPLING_SEED")
+        return pipe(prompt, max_length=nummer_length, do_sample=True, top_k=top_k, num_return_sequences=1,
+                    pad_token_id=pipe.tokenizer.eos_token_id)
+
+    from transformers import set_seed  # Only the Mistral environment has transformers
+
+    # A prompt sent again with the same model, decoding parameters and seed gets the stored output
+    model_name = pipe.model.name_or_path
+    params = {'max_length': nummer_length, 'do_sample': True, 'top_k': top_k, 'num_return_sequences': 1,
+              'seed': seed}
+    cached = cache.lookup('huggingface', model_name, prompt, params)
+    if cached is not None:
+        return json.loads(cached)
+
+    set_seed(seed)
+    output = pipe(prompt, max_length=nummer_length, do_sample=True, top_k=top_k, num_return_sequences=1,
+                  pad_token_id=pipe.tokenizer.eos_token_id)
+    cache.store('huggingface', model_name, prompt, params, json.dumps(output))
+    return output
 
 
 def count_tokens(prompt, mistral_tokenizer):
@@ -36,22 +64,22 @@ def find_top_3_processed_similar_words_m1(word, train_set_lines, suggestions_mem
             suggestion = re.sub(r'[^\w\s]', '', suggestion)
         return suggestion
 
-    # Check if we have previously saved suggestions
-    if word in suggestions_memory:
-        return suggestions_memory[word]
-
-    all_words = [line.split() for line in train_set_lines]
-    flat_list = [item for sublist in all_words for item in sublist]
+    # Check if we have previously saved suggestions (for this dictionary, in any run)
+    lexicon = get_lexicon_index(train_set_lines)
+    key = ('m1', lexicon.digest, word, is_start_of_line)
+    saved = suggestions_memory.get(key)
+    if saved is not None:
+        return saved
 
-    matches = get_close_matches(word, flat_list, n=3, cutoff=0.85)
+    # Same matches as difflib.get_close_matches over all the tokens of the lines, from an index built once
+    matches = lexicon.close_matches(word, n=3, cutoff=0.85)
     unique_matches = list(dict.fromkeys(matches))  # Remove duplicates while preserving order
     split_matches = [split_suggestion(match, word) for match in unique_matches]
 
-    # Save suggestions in memory if they are different from the original word
-    if split_matches and split_matches != [word]:
-        suggestions_memory[word] = split_matches
-
-    return split_matches if split_matches else [word]
+    # Save the suggestions, including "no suggestion", so the word is never looked up again
+    suggestions = split_matches if split_matches else [word]
+    suggestions_memory[key] = suggestions
+    return suggestions
 
 
 def suggest_corrections_for_ocr_text_m1(ocr_text, train_set_lines, suggestions_memory):
@@ -80,14 +108,15 @@ def find_top_3_processed_similar_words_m2(word, train_set_lines, suggestions_mem
 
         return suggestion
 
-    # Check if we have previously saved suggestions
-    if word in suggestions_memory:
-        return suggestions_memory[word]
-
-    all_words = [line.split() for line in train_set_lines]
-    flat_list = [item for sublist in all_words for item in sublist]
+    # Check if we have previously saved suggestions (for this dictionary, in any run)
+    lexicon = get_lexicon_index(train_set_lines)
+    key = ('m2', lexicon.digest, word, is_start_of_line)
+    saved = suggestions_memory.get(key)
+    if saved is not None:
+        return saved
 
-    matches = get_close_matches(word, flat_list, n=3, cutoff=0.85)
+    # Same matches as difflib.get_close_matches over all the tokens of the lines, from an index built once
+    matches = lexicon.close_matches(word, n=3, cutoff=0.85)
     unique_matches = list(dict.fromkeys(matches))  # Remove duplicates while preserving order
 
     # Remove the original word from matches
@@ -95,11 +124,10 @@ def find_top_3_processed_similar_words_m2(word, train_set_lines, suggestions_mem
 
     split_matches = [split_suggestion(match, word) for match in unique_matches]
 
-    # Save suggestions in memory if they are different from the original word
-    if split_matches:
-        suggestions_memory[word] = split_matches
-
-    return split_matches if split_matches else [word]
+    # Save the suggestions, including "no suggestion", so the word is never looked up again
+    suggestions = split_matches if split_matches else [word]
+    suggestions_memory[key] = suggestions
+    return suggestions
 
 
 # Detect OCR Errors and Suggest Corrections
@@ -289,23 +317,24 @@ def calculate_pipe_openai(model_name, system_prompt, max_tokens, openai_token):
 
     Returns:
         dict: The response from OpenAI's API, containing the generated text.
+
+    The request goes through the process-wide engine of the API key (one client, bounded concurrency and
+    RPM/TPM limits, see utils/openai_engine.py), so it can be called from many threads at once.
+    Responses are stored in the response cache, so the same prompt is only paid once (utils/response_cache.py).
+    While a batch stage is compiled, a request without a stored response raises BatchRequestPending
+    (utils/openai_batch.py).
     """
-    try:
-        # Set the OpenAI API key
-        client = OpenAI(
-            # This is the default and can be omitted
-            api_key=openai_token,
-        )
+    cache = get_response_cache()
+    params = {'max_tokens': max_tokens, 'temperature': 0, 'top_p': 1.0}
+    cached = cache.lookup('openai', model_name, system_prompt, params)
+    if cached is not None:
+        return ChatCompletion.model_validate_json(cached)
+    pending_request('openai', model_name, system_prompt, params)  # Only raises while a batch stage is compiled
 
+    try:
         # Use the OpenAI ChatCompletion API for chat models
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": system_prompt}],  # Chat model uses messages
-            max_tokens=max_tokens,
-            temperature=0,
-            top_p=1.0,
-            stream=False,  # Set to True if you want streaming
-        )
+        response = get_engine(openai_token).complete(model_name, system_prompt, max_tokens, temperature=0, top_p=1.0)
+        cache.store('openai', model_name, system_prompt, params, response.model_dump_json())
 
         # Return the full response
         return response
@@ -5,6 +5,7 @@ import json
 import os
 
 from constants import results_from_TrOCR_path, results_from_Flor_path
+from utils.results_catalog import get_catalog
 
 
 def save_to_json(data, file_path):
@@ -17,21 +18,9 @@ def load_from_json(file_path):
         return json.load(json_file)
 
 
-def get_latest_result(test_dir):
-    # List all files in the test directory
-    files = [f for f in os.listdir(test_dir) if f.startswith('results_') and f.endswith('.json')]
-
-    # If there are no result files, return None
-    if not files:
-        return None
-
-    # Sort the files by name (which includes the date and time)
-    files.sort()
-
-    # The latest file will be the last one in the sorted list
-    latest_file = files[-1]
-
-    return os.path.join(test_dir, latest_file)
+def get_latest_result(test_dir, dictionary=None):
+    # The latest file (by the date and time in its name) comes from the catalog of the directory
+    return get_catalog(test_dir).latest(dictionary=dictionary)
 
 
 def create_testing_file(base_dir, dataset, partition, result, train_suggestion, llm_name, name_method, model_ocr):
@@ -67,8 +56,8 @@ def get_latest_result_for_datasets(llms, datasets, train_sizes, type_model):
     for llm in llms:
         for dataset in datasets:
             for train_size in train_sizes:
-                test_dir = os.path.join(name_model_ocr, dataset, train_size)
-                latest_result_path = get_latest_result(test_dir)
+                # One catalog per results root: the whole tree is scanned once, not each directory per call
+                latest_result_path = get_catalog(name_model_ocr).latest(dataset, train_size)
                 if latest_result_path:
                     results.append((llm, dataset, train_size, latest_result_path))
                 else:
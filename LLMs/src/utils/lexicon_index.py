@@ -0,0 +1,112 @@
+# src/utils/lexicon_index.py
+
+"""
+Lexicon of a suggestion dictionary (training set lines) for the close-word lookups of the text processing methods:
+    LexiconIndex: deduplicated vocabulary with frequencies and per-word character counts
+    get_lexicon_index: index of a list of lines, built once and reused while the same list is passed
+
+Every index also carries the SHA-256 `digest` of its lines, which identifies the dictionary across runs.
+
+`LexiconIndex.close_matches(word)` returns exactly what `difflib.get_close_matches(word, tokens)` returns for the
+non-deduplicated token list of the lines, including repeated words: candidates are scored with the same
+SequenceMatcher ratios and ranked as (score, word) like `heapq.nlargest`, a word counting as many times as it
+occurs in the lines. Each distinct word is considered once, and the two upper bounds difflib checks before the
+ratio (length bound and common characters) are computed for the whole vocabulary at once with NumPy, so the
+exact ratio is only computed for the few words that can reach the cutoff.
+"""
+
+import hashlib
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+
+import numpy as np
+
+CACHE_MAX_INDEXES = 8
+
+_indexes = []  # (lines object, number of lines, LexiconIndex), most recent last
+_lock = threading.Lock()
+
+
+class LexiconIndex:
+    """Vocabulary of a list of text lines (tokens split on whitespace)"""
+
+    def __init__(self, train_set_lines):
+        # Identifies the dictionary in persistent caches (e.g., the suggestion cache)
+        self.digest = hashlib.sha256("\n".join(train_set_lines).encode('utf-8')).hexdigest()
+        self.frequencies = Counter(token for line in train_set_lines for token in line.split())
+        self.tokens = sorted(self.frequencies, key=len)
+        self.lengths = np.array([len(token) for token in self.tokens], dtype=np.int64)
+
+        # Character counts of every token, to bound the ratio of all candidates at once
+        alphabet = sorted({char for token in self.tokens for char in token})
+        self.char_index = {char: i for i, char in enumerate(alphabet)}
+        self.char_counts = np.zeros((len(self.tokens), len(alphabet)), dtype=np.int32)
+        for row, token in enumerate(self.tokens):
+            for char, count in Counter(token).items():
+                self.char_counts[row, self.char_index[char]] = count
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    def close_matches(self, word, n=3, cutoff=0.85):
+        """
+        Same result as `difflib.get_close_matches(word, tokens, n, cutoff)` over all tokens of the lines.
+
+        :param word: Word to look up.
+        :param n: Maximum number of matches (a repeated word can fill several places, as with difflib).
+        :param cutoff: Minimum SequenceMatcher ratio, in [0, 1].
+        :return: List of matches, best first.
+        """
+        if not self.tokens:
+            return []
+
+        # SequenceMatcher.real_quick_ratio: 2 * min(len(a), len(b)) / (len(a) + len(b)), only tokens of nearby lengths
+        totals = self.lengths + len(word)
+        bound = 2.0 * np.minimum(self.lengths, len(word)) / totals
+        candidates = np.flatnonzero(bound >= cutoff)
+
+        # SequenceMatcher.quick_ratio: 2 * (size of the common character multiset) / (len(a) + len(b))
+        word_counts = np.zeros(self.char_counts.shape[1], dtype=np.int32)
+        for char, count in Counter(word).items():
+            if char in self.char_index:
+                word_counts[self.char_index[char]] = count
+        common = np.minimum(self.char_counts[candidates], word_counts).sum(axis=1)
+        candidates = candidates[2.0 * common / totals[candidates] >= cutoff]
+
+        # Exact ratio for the few tokens left
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        scored = []
+        for token in (self.tokens[i] for i in candidates):
+            matcher.set_seq1(token)
+            if matcher.ratio() >= cutoff:
+                scored.append((matcher.ratio(), token))
+
+        # heapq.nlargest order over the token list: (score, word) descending, each word repeated by its frequency
+        matches = []
+        for score, token in sorted(scored, reverse=True):
+            matches.extend([token] * min(self.frequencies[token], n - len(matches)))
+            if len(matches) == n:
+                break
+        return matches
+
+
+def get_lexicon_index(train_set_lines):
+    """
+    Return the index of a list of training set lines, building it the first time the list is seen.
+    The list is recognised by identity (and length), so it must not be modified while it is in use.
+    """
+    with _lock:
+        for i, (lines, count, index) in enumerate(_indexes):
+            if lines is train_set_lines and count == len(train_set_lines):
+                _indexes.append(_indexes.pop(i))
+                return index
+
+    index = LexiconIndex(train_set_lines)
+
+    with _lock:
+        _indexes.append((train_set_lines, len(train_set_lines), index))
+        del _indexes[:-CACHE_MAX_INDEXES]
+
+    return index
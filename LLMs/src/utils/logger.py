@@ -38,3 +38,13 @@ def setup_logger(log_file_path=None):
 
     return logger
 
+
+class LineLogger(logging.LoggerAdapter):
+    """Logger of one text line: prefixes its messages with the line's file name, so that the traces of lines
+    processed concurrently can be told apart in the run log."""
+
+    def __init__(self, logger, file_name):
+        super().__init__(logger, {'file_name': file_name})
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['file_name']}] {msg}", kwargs
@@ -0,0 +1,243 @@
+# src/utils/openai_batch.py
+
+"""
+Batch mode of the OpenAI calls for whole evaluation runs (no interactive latency needed):
+    BatchRequestPending: raised by calculate_pipe_openai while a stage is compiled, for a request not answered yet
+    collect_requests: context in which the missing responses are collected instead of requested
+    pending_request: record a missing response (called by calculate_pipe_openai)
+    OpenAIBatchBackend: submission through the OpenAI Batch API (files + batches endpoints)
+    LocalBatchBackend: file-based stand-in, answering a request file with a responder function or an external process
+    run_batch_stages: answer every OpenAI request of a strategy over a dataset, one batch per stage
+
+The strategies call the API line by line, each stage depending on the previous answer (spelling, correction,
+duplicates, punctuation, evaluation). A stage is compiled by running the strategy over every line while collecting
+requests: each line goes as far as the responses already in the response cache (utils/response_cache.py) allow, and
+stops at its first missing one. The collected requests are written to a JSONL request file, submitted as one batch,
+and the results are stored in the response cache, which is the per-line state of the next stage. When no request is
+missing, a normal run (evaluate_and_correct_ocr_results_gpt) reads every response from the cache; requests that
+failed in a batch are then sent through the interactive engine.
+
+The cache keys are the prompts, so the stages and the evaluation may run in different processes (a stopped run
+resumes after its last ingested batch, and a later evaluation reuses the batch results) only because the strategies
+build the same prompt in every process; the suggestions, for instance, are listed in ranked order, not in the
+per-process order of a set. A strategy whose prompts depend on the process (hash seed, time, randomness) must run
+its stages and its evaluation in one process: otherwise a new process recompiles every request under new keys and
+pays for the batches again. check_response_cache_replay.py checks this for GptTextProcessingM1.
+"""
+
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from openai import OpenAI
+
+from utils.response_cache import get_response_cache, request_key
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+_collector = None
+
+
+class BatchRequestPending(Exception):
+    """The response of a request is collected for the next batch"""
+
+
+class collect_requests:
+    """
+    Context collecting the requests that have no response yet, as {custom_id: batch request line}.
+    Only one collection runs at a time, in the thread that runs the strategy.
+    """
+
+    def __enter__(self):
+        global _collector
+        _collector = dict()
+        return _collector
+
+    def __exit__(self, *exc_info):
+        global _collector
+        _collector = None
+        return False
+
+
+def pending_request(backend, model_name, prompt, params):
+    """
+    Record a request without a cached response and stop the line, if requests are being collected.
+
+    :raise BatchRequestPending: While a stage is compiled.
+    """
+    if _collector is None or backend != 'openai':
+        return
+
+    # Same custom_id as the response cache key, so the results are stored without matching prompts again
+    custom_id = request_key(backend, model_name, prompt, params)
+    _collector[custom_id] = {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': {'model': model_name, 'messages': [{'role': 'user', 'content': prompt}], **params}
+    }
+    raise BatchRequestPending(custom_id)
+
+
+class OpenAIBatchBackend:
+    """
+    OpenAI Batch API: upload the request file, create the batch, poll it and download the output file.
+
+    :param openai_token: OpenAI API key.
+    :param base_url: API server (None for OPENAI_BASE_URL or the OpenAI API).
+    """
+
+    def __init__(self, openai_token, base_url=None):
+        self.client = OpenAI(api_key=openai_token, base_url=base_url or os.getenv("OPENAI_BASE_URL"))
+
+    def submit(self, request_path):
+        with open(request_path, 'rb') as request_file:
+            uploaded = self.client.files.create(file=request_file, purpose='batch')
+        batch = self.client.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT,
+                                           completion_window='24h')
+        return batch.id
+
+    def status(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id):
+        """Lines of the output file (answered requests) and of the error file (failed requests)"""
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(self.client.files.content(file_id).text.splitlines())
+        return lines
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the Batch API: a batch is a directory holding `input.jsonl`, completed once
+    `output.jsonl` (same format as the Batch API output file) is written next to it.
+
+    :param directory: Directory of the batches.
+    :param respond: Function (request body -> ChatCompletion dict) answering a batch at submission;
+        None to wait for another process to write the output file.
+    """
+
+    def __init__(self, directory, respond=None):
+        self.directory = directory
+        self.respond = respond
+
+    def submit(self, request_path):
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        batch_dir = os.path.join(self.directory, batch_id)
+        os.makedirs(batch_dir)
+        shutil.copyfile(request_path, os.path.join(batch_dir, 'input.jsonl'))
+
+        if self.respond is not None:
+            with open(request_path, 'r') as request_file:
+                requests = [json.loads(line) for line in request_file if line.strip()]
+            lines = [
+                json.dumps({'id': f"batch_req_{i}", 'custom_id': request['custom_id'],
+                            'response': {'status_code': 200, 'body': self.respond(request['body'])}, 'error': None})
+                for i, request in enumerate(requests)
+            ]
+            with open(os.path.join(batch_dir, 'output.jsonl.tmp'), 'w') as output_file:
+                output_file.write("\n".join(lines) + "\n")
+            os.replace(os.path.join(batch_dir, 'output.jsonl.tmp'), os.path.join(batch_dir, 'output.jsonl'))
+
+        return batch_id
+
+    def status(self, batch_id):
+        completed = os.path.exists(os.path.join(self.directory, batch_id, 'output.jsonl'))
+        return 'completed' if completed else 'in_progress'
+
+    def results(self, batch_id):
+        with open(os.path.join(self.directory, batch_id, 'output.jsonl'), 'r') as output_file:
+            return output_file.read().splitlines()
+
+
+def _ingest(lines, requests, logger):
+    """Store the answered requests of a batch output in the response cache; return how many were stored"""
+    cache = get_response_cache()
+    stored = 0
+
+    for line in lines:
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        request = requests.get(result.get('custom_id'))
+        response = result.get('response') or {}
+
+        if request is None or response.get('status_code') != 200:
+            logger.error(f"Batch request {result.get('custom_id')} failed: {result.get('error') or response}")
+            continue
+
+        body = request['body']
+        params = {key: value for key, value in body.items() if key not in ('model', 'messages')}
+        cache.store('openai', body['model'], body['messages'][0]['content'], params, json.dumps(response['body']))
+        stored += 1
+
+    return stored
+
+
+def run_batch_stages(loaded_data, train_set_lines, text_processing_strategy, model_name, openai_token, llm_name_2,
+                     backend, work_dir, logger, max_lines=None, poll_interval=30):
+    """
+    Answer every OpenAI request of a strategy over a dataset through batches, one batch per stage, so a
+    following evaluate_and_correct_ocr_results_gpt run reads all its responses from the response cache.
+    Calling it again (in this or a new process) only submits the requests still missing, provided the strategy
+    builds process-independent prompts (see the module docstring).
+
+    :param backend: OpenAIBatchBackend or LocalBatchBackend.
+    :param work_dir: Directory of the request files (`stage_{n}_requests.jsonl`).
+    :param poll_interval: Seconds between two status checks of a batch.
+    :return: Number of batches submitted.
+    """
+    if get_response_cache().mode != 'readwrite':
+        raise ValueError("Batch mode stores the batch results in the response cache: set LLM_CACHE_MODE=readwrite")
+
+    os.makedirs(work_dir, exist_ok=True)
+    items = loaded_data if max_lines is None else loaded_data[:max_lines]
+
+    # The compiling passes are replayed once per stage: their logs would repeat the same lines
+    compile_logger = logging.getLogger(f"{__name__}.compile")
+    compile_logger.disabled = True
+
+    stage = 0
+    while True:
+        with collect_requests() as requests:
+            for item in items:
+                try:
+                    text_processing_strategy.check_and_correct_text_line(
+                        item['predicted_label'], train_set_lines, model_name, openai_token, llm_name_2, compile_logger
+                    )
+                except BatchRequestPending:
+                    pass  # The line continues in the next stage
+
+        if not requests:
+            break
+
+        stage += 1
+        request_path = os.path.join(work_dir, f"stage_{stage}_requests.jsonl")
+        with open(request_path, 'w') as request_file:
+            for request in requests.values():
+                request_file.write(json.dumps(request) + "\n")
+
+        batch_id = backend.submit(request_path)
+        logger.info(f"Batch stage {stage}: {len(requests)} requests submitted ({batch_id})")
+
+        status = backend.status(batch_id)
+        while status not in FINAL_STATUSES:
+            time.sleep(poll_interval)
+            status = backend.status(batch_id)
+
+        stored = _ingest(backend.results(batch_id), requests, logger) if status == 'completed' else 0
+        logger.info(f"Batch stage {stage}: {status}, {stored}/{len(requests)} responses stored")
+
+        if stored == 0:
+            # Nothing answered: the remaining requests go through the interactive engine in the evaluation run
+            logger.error(f"Batch stage {stage} made no progress, stopping the batch mode")
+            break
+
+    return stage
@@ -0,0 +1,163 @@
+# src/utils/openai_engine.py
+
+"""
+Shared execution engine of the OpenAI chat completion calls:
+    TokenBucket: asyncio rate limiter refilled continuously up to a per-minute capacity
+    OpenAIEngine: one AsyncOpenAI client on a background event loop, with a concurrency limit and RPM/TPM buckets
+    get_engine: engine shared by every caller of the process for an API key and base URL
+
+Synchronous code (the text processing strategies) calls `OpenAIEngine.complete`, which runs the request on the
+engine loop and waits for it; many threads can wait at once, and the engine keeps at most `max_concurrency`
+requests in flight and within the requests-per-minute and tokens-per-minute limits. Asynchronous code can await
+`OpenAIEngine.acomplete` directly from the engine loop.
+
+Settings come from the environment (or the `get_engine` arguments):
+    OPENAI_BASE_URL: API server, e.g., a local stub server for tests (default: the OpenAI API)
+    OPENAI_MAX_CONCURRENCY: maximum number of requests in flight (default: 16)
+    OPENAI_RPM_LIMIT: requests per minute, 0 for no limit (default: 500)
+    OPENAI_TPM_LIMIT: tokens per minute (prompt + max_tokens), 0 for no limit (default: 200000)
+    OPENAI_MAX_RETRIES: retries of a request after a 429, a timeout or a server error (default: 5)
+
+The retries are the only backoff: the client waits (exponential delay, or the server's Retry-After) on the engine
+loop, so a 429 holds one in-flight slot instead of a sleeping caller thread, and the callers send each request once.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+
+from openai import AsyncOpenAI
+
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 16))
+RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", 500))
+TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", 200_000))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 5))
+
+_engines = dict()
+_engines_lock = threading.Lock()
+
+
+def estimate_tokens(prompt):
+    """Approximate number of tokens of a prompt (about 4 characters per token), without loading an encoding"""
+    return math.ceil(len(prompt) / 4)
+
+
+class TokenBucket:
+    """
+    Rate limiter allowing `per_minute` units per minute, refilled continuously (bursts up to `per_minute`).
+
+    :param per_minute: Units per minute (requests or tokens).
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        """Wait until `amount` units are available and take them (a request larger than the capacity waits for a full bucket)"""
+        amount = min(amount, self.capacity)
+        async with self.lock:  # First come, first served
+            self._refill()
+            while self.level < amount:
+                await asyncio.sleep((amount - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+
+    def adjust(self, amount):
+        """Take (or give back, if negative) units once the actual usage of a request is known"""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+class OpenAIEngine:
+    """
+    Chat completion calls through one shared AsyncOpenAI client (and connection pool).
+
+    :param api_key: OpenAI API key.
+    :param base_url: API server (None for OPENAI_BASE_URL or the OpenAI API).
+    :param max_concurrency: Maximum number of requests in flight.
+    :param rpm_limit: Requests per minute (0 for no limit).
+    :param tpm_limit: Tokens per minute, prompt and completion (0 for no limit).
+    :param max_retries: Retries of a rate limited or failed request, with backoff, before its error is raised.
+    """
+
+    def __init__(self, api_key, base_url=None, max_concurrency=MAX_CONCURRENCY, rpm_limit=RPM_LIMIT,
+                 tpm_limit=TPM_LIMIT, max_retries=MAX_RETRIES):
+        self.max_concurrency = max_concurrency
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+                                  max_retries=max_retries)
+
+        # The loop owns the client and the limiters; it runs for the lifetime of the process
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="openai-engine", daemon=True)
+        self.thread.start()
+
+        async def create_limiters():
+            self.semaphore = asyncio.Semaphore(max_concurrency)
+            self.requests = TokenBucket(rpm_limit) if rpm_limit else None
+            self.tokens = TokenBucket(tpm_limit) if tpm_limit else None
+
+        asyncio.run_coroutine_threadsafe(create_limiters(), self.loop).result()
+
+    async def acomplete(self, model_name, prompt, max_tokens, temperature=0, top_p=1.0):
+        """
+        Send one chat completion request, once the concurrency and rate limits allow it.
+
+        :param model_name: OpenAI model name (e.g., 'gpt-4o-mini').
+        :param prompt: User message.
+        :param max_tokens: Maximum number of generated tokens.
+        :return: The ChatCompletion response (OpenAI errors are raised).
+        """
+        expected_tokens = estimate_tokens(prompt) + max_tokens
+
+        if self.requests is not None:
+            await self.requests.acquire()
+        if self.tokens is not None:
+            await self.tokens.acquire(expected_tokens)
+
+        async with self.semaphore:
+            response = await self.client.chat.completions.create(
+                model=model_name,
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=max_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                stream=False,
+            )
+
+        # Charge the actual usage instead of the estimate when the server reports it
+        usage = getattr(response, 'usage', None)
+        if self.tokens is not None and usage is not None and usage.total_tokens is not None:
+            self.tokens.adjust(usage.total_tokens - expected_tokens)
+
+        return response
+
+    def complete(self, model_name, prompt, max_tokens, temperature=0, top_p=1.0):
+        """Blocking version of `acomplete`, callable from any thread except the engine loop"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.acomplete(model_name, prompt, max_tokens, temperature, top_p), self.loop
+        )
+        return future.result()
+
+
+def get_engine(api_key, base_url=None, **limits):
+    """
+    Return the engine of an API key and base URL, created on first use and shared within the process.
+
+    :param limits: `max_concurrency`, `rpm_limit`, `tpm_limit` and `max_retries` of a new engine (defaults from the environment).
+    """
+    key = (api_key, base_url or os.getenv("OPENAI_BASE_URL"))
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = OpenAIEngine(api_key, base_url, **limits)
+        return _engines[key]
@@ -0,0 +1,139 @@
+# src/utils/response_cache.py
+
+"""
+Content-addressed cache of the LLM responses (OpenAI chat completions and Hugging Face pipelines):
+    ResponseCacheMiss: raised in replay mode when a response is not in the cache
+    ResponseCache: SQLite store of serialized responses keyed by the hash of the request
+    SAMPLING_SEED: seed of the sampled generations (LLM_SAMPLING_SEED), None to leave them uncached
+    request_key: hash of (backend, model name, full prompt, decoding parameters)
+    get_response_cache: cache shared by every caller of the process
+
+A request sent again byte for byte (same backend, model, prompt and decoding parameters) gets the stored response
+instead of a new call. The mode comes from LLM_CACHE_MODE:
+    readwrite: look up every request and store the new responses (default)
+    replay: only serve stored responses, a miss raises ResponseCacheMiss (offline CI and benchmarks)
+    off: no lookup, no storage
+
+Sampled generations (`do_sample=True`, the Hugging Face pipelines) are only cached when a sampling seed is set
+(LLM_SAMPLING_SEED), since the seeded output is then the same in every run.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from constants import response_cache_path
+
+CACHE_MODES = ('readwrite', 'replay', 'off')
+CACHE_MODE = os.getenv("LLM_CACHE_MODE", "readwrite")
+# Seed of the sampled (Hugging Face) generations. Without it they are neither looked up nor stored, even in
+# readwrite mode: caching an unseeded sample would replay the first run's sample in every later experiment.
+# Replay mode cannot run them at all.
+SAMPLING_SEED = int(os.getenv("LLM_SAMPLING_SEED")) if os.getenv("LLM_SAMPLING_SEED") else None
+
+_caches = dict()
+_caches_lock = threading.Lock()
+
+
+class ResponseCacheMiss(KeyError):
+    """A request has no stored response and the cache is in replay mode"""
+
+
+def request_key(backend, model_name, prompt, params):
+    """
+    Hash identifying a request.
+
+    :param backend: 'openai' or 'huggingface'.
+    :param model_name: Model name (or path) of the backend.
+    :param prompt: Full prompt.
+    :param params: Decoding parameters (dict of JSON values).
+    :return: SHA-256 hex digest.
+    """
+    request = json.dumps([backend, model_name, prompt, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Serialized responses by request hash, in an SQLite file (WAL mode, one connection per thread and process).
+
+    :param path: SQLite file, created if needed.
+    :param mode: 'readwrite', 'replay' or 'off'.
+    """
+
+    def __init__(self, path, mode=CACHE_MODE):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode} (expected one of {', '.join(CACHE_MODES)})")
+
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, backend TEXT, model TEXT, "
+                "response TEXT, created REAL) WITHOUT ROWID"
+            )
+
+    def _connection(self):
+        """Connection of the current thread (reopened in a forked process)"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def lookup(self, backend, model_name, prompt, params):
+        """
+        Return the stored response of a request, or None (to be computed and stored).
+
+        :raise ResponseCacheMiss: In replay mode, when the request has no stored response.
+        """
+        if self.mode == 'off':
+            return None
+
+        key = request_key(backend, model_name, prompt, params)
+        row = self._connection().execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+
+        with self.lock:
+            if row is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if row is None and self.mode == 'replay':
+            raise ResponseCacheMiss(f"No stored {backend} response for {model_name} (request {key})")
+        return row[0] if row is not None else None
+
+    def store(self, backend, model_name, prompt, params, response):
+        """Store the serialized response of a request (ignored when the cache is off or in replay mode)"""
+        if self.mode != 'readwrite':
+            return
+
+        key = request_key(backend, model_name, prompt, params)
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                               (key, backend, model_name, response, time.time()))
+
+    def stats(self):
+        """Hits and misses since the cache was opened"""
+        with self.lock:
+            return {'mode': self.mode, 'hits': self.hits, 'misses': self.misses}
+
+
+def get_response_cache(path=response_cache_path):
+    """Return the response cache of a file, shared within the process"""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path)
+        return _caches[path]
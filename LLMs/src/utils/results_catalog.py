@@ -0,0 +1,128 @@
+# src/utils/results_catalog.py
+
+"""
+Catalog of the result files under a results directory (LLMs/results, Flor_model/results, TrOCR_model/results):
+    ResultsCatalog: latest `results_*.json` of every results directory, refreshed by polling directory mtimes
+    get_catalog: shared catalog of a results root
+
+Result files are named `results_{timestamp}.json` (OCR models) or `results_{dictionary}_{timestamp}.json` (LLMs);
+the latest one of a directory and dictionary is the one with the greatest timestamp. The tree is scanned once,
+then a refresh only lists the directories whose mtime changed (a file was added, removed or renamed in them).
+Refreshes happen at most every `min_interval` seconds, so lookups in between are plain dictionary reads.
+
+This module only depends on the standard library: the GraphQL server (Datasets) loads it from this file too.
+"""
+
+import os
+import re
+import threading
+import time
+
+RESULT_FILE_PATTERN = re.compile(
+    r"^results_(?:(?P<dictionary>.+)_)?(?P<timestamp>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.json$"
+)
+
+_catalogs = dict()
+_catalogs_lock = threading.Lock()
+
+
+class ResultsCatalog:
+    """
+    Latest result file of every (directory, dictionary) under `root`.
+
+    :param root: Results directory.
+    :param min_interval: Minimum number of seconds between two refreshes (0 to refresh on every lookup).
+    """
+
+    def __init__(self, root, min_interval=1.0):
+        self.root = os.path.abspath(root)
+        self.min_interval = min_interval
+        self.directories = dict()  # relative parts -> (mtime_ns, subdirectory names)
+        self.latest_files = dict()  # (relative parts, dictionary) -> file name
+        self.refreshed = None
+        self.lock = threading.Lock()
+
+    def _scan_directory(self, parts, path, mtime):
+        """List one directory: record its subdirectories and the latest file of each of its dictionaries"""
+        subdirectories = []
+        latest = dict()
+
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirectories.append(entry.name)
+                    continue
+
+                match = RESULT_FILE_PATTERN.match(entry.name)
+                if match:
+                    dictionary = match['dictionary']
+                    if dictionary not in latest or match['timestamp'] > latest[dictionary][0]:
+                        latest[dictionary] = (match['timestamp'], entry.name)
+
+        for key in [key for key in self.latest_files if key[0] == parts]:
+            del self.latest_files[key]
+        for dictionary, (_, name) in latest.items():
+            self.latest_files[(parts, dictionary)] = name
+
+        self.directories[parts] = (mtime, subdirectories)
+
+    def _forget(self, parts):
+        """Drop a directory that no longer exists, and everything under it"""
+        stale = [key for key in self.directories if key[:len(parts)] == parts]
+        for key in stale:
+            del self.directories[key]
+        for key in [key for key in self.latest_files if key[0][:len(parts)] == parts]:
+            del self.latest_files[key]
+
+    def refresh(self):
+        """Rescan the directories whose mtime changed since the last refresh"""
+        with self.lock:
+            pending = [()]
+            while pending:
+                parts = pending.pop()
+                path = os.path.join(self.root, *parts)
+
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except FileNotFoundError:
+                    self._forget(parts)
+                    continue
+
+                known = self.directories.get(parts)
+                if known is None or known[0] != mtime:
+                    previous = set(known[1]) if known else set()
+                    self._scan_directory(parts, path, mtime)
+                    for removed in previous - set(self.directories[parts][1]):
+                        self._forget(parts + (removed,))
+
+                pending.extend(parts + (name,) for name in self.directories[parts][1])
+
+            self.refreshed = time.monotonic()
+
+    def latest(self, *parts, dictionary=None):
+        """
+        Return the path of the latest result file of a results directory, or None if it has none.
+
+        :param parts: Path of the directory relative to the root (e.g., dataset, OCR model, LLM, method, partition).
+        :param dictionary: Suggestion dictionary of LLM results (None for OCR results).
+        """
+        if self.refreshed is None or time.monotonic() - self.refreshed >= self.min_interval:
+            self.refresh()
+
+        name = self.latest_files.get((tuple(parts), dictionary))
+        return os.path.join(self.root, *parts, name) if name else None
+
+    def files(self):
+        """Paths of the latest result file of every (directory, dictionary)"""
+        self.refresh()
+        with self.lock:
+            return [os.path.join(self.root, *parts, name) for (parts, _), name in self.latest_files.items()]
+
+
+def get_catalog(root, min_interval=1.0):
+    """Return the catalog of a results root, shared by every caller of the process"""
+    root = os.path.abspath(root)
+    with _catalogs_lock:
+        if root not in _catalogs:
+            _catalogs[root] = ResultsCatalog(root, min_interval)
+        return _catalogs[root]
@@ -0,0 +1,125 @@
+# src/utils/suggestion_cache.py
+
+"""
+Persistent cache of the close-word suggestions of the text processing methods:
+    SuggestionCache: SQLite store with a bounded in-memory LRU in front, used like a dict
+    get_suggestion_cache: cache shared by every strategy of the process
+
+Keys are (method variant, dictionary digest, OCR word, is_start_of_line): suggestions only depend on them, so
+entries stay valid across train sizes, dictionaries and restarts. The store runs in WAL mode with a busy timeout,
+so concurrent worker processes can read and write it; each thread (and process) uses its own connection.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from constants import suggestion_cache_path
+
+MEMORY_MAX_ENTRIES = 100_000
+
+_caches = dict()
+_caches_lock = threading.Lock()
+
+
+class SuggestionCache:
+    """
+    Suggestions by key, in memory (LRU of `max_entries`) and in an SQLite file.
+
+    :param path: SQLite file, created if needed.
+    :param max_entries: Maximum number of entries kept in memory.
+    """
+
+    def __init__(self, path, max_entries=MEMORY_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS suggestions (method TEXT, dictionary TEXT, word TEXT, start INTEGER, "
+                "suggestions TEXT, PRIMARY KEY (method, dictionary, word, start)) WITHOUT ROWID"
+            )
+
+    def _connection(self):
+        """Connection of the current thread (reopened in a forked process)"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def _remember(self, key, value):
+        with self.lock:
+            self.memory[key] = value
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def get(self, key, default=None):
+        """
+        Return the suggestions of a key, or `default`.
+
+        :param key: (method variant, dictionary digest, word, is_start_of_line).
+        """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+
+        method, dictionary, word, start = key
+        row = self._connection().execute(
+            "SELECT suggestions FROM suggestions WHERE method = ? AND dictionary = ? AND word = ? AND start = ?",
+            (method, dictionary, word, int(start))
+        ).fetchone()
+
+        if row is None:
+            with self.lock:
+                self.misses += 1
+            return default
+
+        value = json.loads(row[0])
+        self._remember(key, value)
+        with self.lock:
+            self.hits += 1
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        method, dictionary, word, start = key
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO suggestions VALUES (?, ?, ?, ?, ?)",
+                               (method, dictionary, word, int(start), json.dumps(value)))
+        self._remember(key, value)
+
+    def clear(self):
+        """Drop the in-memory entries (the SQLite store is kept)"""
+        with self.lock:
+            self.memory.clear()
+
+
+def get_suggestion_cache(path=suggestion_cache_path):
+    """Return the suggestion cache of a file, shared within the process"""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = SuggestionCache(path)
+        return _caches[path]
@@ -1,13 +1,22 @@
 # TrOCR_config.py
 
 from dataclasses import dataclass
+import io
+import json
+import mmap
 import h5py
+import numpy as np
 import torchvision.transforms as transforms
 from torch.utils.data import Dataset
 from PIL import Image
 import torch
 import os
 
+try:
+    import hdf5plugin  # noqa: F401  Registers the optional blosc/zstd filters used by some dataset builds
+except ImportError:
+    hdf5plugin = None
+
 """
 Augmentations are applied to the training images to make the model robust to variations in input.
 """
@@ -35,18 +44,22 @@ class HandleDataTrOCR(Dataset):
     It handles loading, preprocessing of images, and conversion of text labels for model training.
     """
 
-    def __init__(self, hdf5_file_path, partition, processor, max_target_length=128):
+    def __init__(self, hdf5_file_path, partition, processor, max_target_length=128, augment=True):
         """
         Initialize the dataset with HDF5 data.
         :param hdf5_file_path: Path to the HDF5 file containing the dataset.
         :param partition: The partition of the data to use ('train_100', 'train_25', 'valid', etc.).
         :param processor: The processor (TrOCRProcessor) for image preprocessing and tokenization.
         :param max_target_length: The maximum length of the text labels.
+        :param augment: Apply `train_transforms` to the images. The augmentations are tuned for the original line
+            image (the blur kernel and sigma are in its pixels, before the 384x384 resize squashes it), so they
+            always run on it; the precomputed pixel values are only used without augmentation.
         """
         self.hdf5_file = h5py.File(hdf5_file_path, 'r')
         self.partition = partition
         self.processor = processor
         self.max_target_length = max_target_length
+        self.augment = augment
 
         # Load the root directory from the HDF5 attributes (full image path)
         self.root_dir = self.hdf5_file.attrs['full_image_path']  # Leave as a string, no need to encode
@@ -55,10 +68,58 @@ class HandleDataTrOCR(Dataset):
         self.image_file_names = self.hdf5_file[f"{partition}/path"][:]  # Relative file names
         self.labels = self.hdf5_file[f"{partition}/gt"][:]  # Ground truth text labels
 
+        # Datasets built with `pack_images=True` hold the original PNG bytes in one archive next to the HDF5 file;
+        # images are then sliced from a memory map instead of opening one file per line
+        self.archive_path = None
+        self.archive = None
+        if 'image_archive' in self.hdf5_file.attrs:
+            self.archive_path = os.path.join(os.path.dirname(hdf5_file_path), self.hdf5_file.attrs['image_archive'])
+            self.png_offsets = self.hdf5_file[f"{partition}/png_offset"][:]
+            self.png_lengths = self.hdf5_file[f"{partition}/png_length"][:]
+
+        # Pixel values precomputed by the dataset build (single normalized channel), None to run the processor
+        self.pixel_values = None if augment else self._load_pixel_values(hdf5_file_path, partition)
+
+    def _load_pixel_values(self, hdf5_file_path, partition):
+        """
+        Memory-map the TrOCR pixel values precomputed by the dataset build (`outputs=[TrOCRPixels()]`),
+        provided they were produced with the size, mean and std of this processor.
+        """
+        if 'trocr_params' not in self.hdf5_file.attrs:
+            return None
+
+        params = json.loads(self.hdf5_file.attrs['trocr_params'])
+        image_processor = getattr(self.processor, 'image_processor', None) or self.processor.feature_extractor
+        size = image_processor.size
+        size = (size['height'], size['width']) if isinstance(size, dict) else (size, size)
+
+        if size != (params['size'], params['size']) \
+                or any(mean != params['mean'] for mean in image_processor.image_mean) \
+                or any(std != params['std'] for std in image_processor.image_std):
+            return None
+
+        # The train subsets are prefixes of the partition they view (e.g., 'train_25' of 'train_100')
+        stored_partition = self.hdf5_file[partition].attrs.get('source_partition', partition)
+        store = f"{os.path.splitext(hdf5_file_path)[0]}.trocr.{stored_partition}.npy"
+        if not os.path.exists(store):
+            return None
+
+        return np.load(store, mmap_mode='r')[:len(self.labels)]
+
     def __len__(self):
         return len(self.labels)
 
-    def __getitem__(self, idx):
+    def _open_image(self, idx):
+        """Open the original line image, from the packed archive when the dataset has one"""
+        if self.archive_path is not None:
+            # Mapped lazily, so every DataLoader worker gets its own map
+            if self.archive is None:
+                with open(self.archive_path, 'rb') as archive_file:
+                    self.archive = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            offset = int(self.png_offsets[idx])
+            return Image.open(io.BytesIO(self.archive[offset:offset + int(self.png_lengths[idx])]))
+
         # The relative image file name (stored in the HDF5)
         file_name = self.image_file_names[idx].decode('utf-8')
 
@@ -66,13 +127,21 @@ class HandleDataTrOCR(Dataset):
         img_path = os.path.join(self.root_dir, file_name)  # Now both components are strings
 
         # Load the image using the full path
-        image = Image.open(img_path).convert('RGB')
+        return Image.open(img_path)
+
+    def __getitem__(self, idx):
+        if self.pixel_values is not None:
+            # Same gray value on the three channels (no augmentation: see `augment`)
+            pixel_values = torch.from_numpy(self.pixel_values[idx].astype(np.float32)).repeat(3, 1, 1)
+        else:
+            image = self._open_image(idx).convert('RGB')
 
-        # Apply augmentations
-        image = train_transforms(image)
+            # Apply augmentations
+            if self.augment:
+                image = train_transforms(image)
 
-        # Preprocess the image to get pixel values
-        pixel_values = self.processor(image, return_tensors='pt').pixel_values
+            # Preprocess the image to get pixel values
+            pixel_values = self.processor(image, return_tensors='pt').pixel_values
 
         # The text (label) associated with the image
         text = self.labels[idx].decode('utf-8')
@@ -101,3 +170,6 @@ class HandleDataTrOCR(Dataset):
         """
         if self.hdf5_file:
             self.hdf5_file.close()
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None